@@ -0,0 +1,204 @@
+"""
+Admission control (per-user and global in-flight limits, load shedding) for the expensive endpoints.
+"""
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from starlette.requests import Request
+
+# class -> (path prefixes, per-user limit, global limit)
+DEFAULT_CLASSES = {
+    "scan": (("/gmail/scan",), 1, 16),
+    "letter": (("/letter/generate",), 2, 32),
+    "privacy": (("/privacy/find_delete_link",), 3, 32),
+    "enrich": (("/accounts/enrich",), 1, 8),
+}
+
+QUEUE_SECONDS = float(os.getenv("ADMISSION_QUEUE_SECONDS", "2"))
+
+
+class _Waiter:
+    __slots__ = ("key", "future", "granted")
+
+    def __init__(self, key: str, future: asyncio.Future):
+        self.key = key
+        self.future = future
+        self.granted = False
+
+
+class EndpointLimiter:
+    def __init__(self, name: str, per_user: int, global_limit: int, queue_seconds: float = QUEUE_SECONDS):
+        self.name = name
+        self.per_user = per_user
+        self.global_limit = global_limit
+        self.queue_seconds = queue_seconds
+        self.max_queue = global_limit * 4
+        # plain lock: never held across an await, and works from any event loop
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._by_user: dict[str, int] = {}
+        self._waiters: deque[_Waiter] = deque()
+        # metrics
+        self.admitted = 0
+        self.shed = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.service_ms_total = 0.0
+
+    def _can_take(self, key: str) -> bool:
+        return self._inflight < self.global_limit and self._by_user.get(key, 0) < self.per_user
+
+    def _take(self, key: str) -> None:
+        self._inflight += 1
+        self._by_user[key] = self._by_user.get(key, 0) + 1
+
+    def retry_after(self) -> int:
+        # roughly one average service time, at least a second
+        avg = self.service_ms_total / self.admitted / 1000 if self.admitted else 1
+        return max(1, math.ceil(avg))
+
+    async def acquire(self, key: str) -> bool:
+        started = time.monotonic()
+        with self._lock:
+            # Free slots are handed to eligible waiters on release, so if one is
+            # free now, every waiter is only blocked by its own per-user limit.
+            if self._can_take(key):
+                self._take(key)
+                self.admitted += 1
+                return True
+            queued_for_key = sum(1 for w in self._waiters if w.key == key)
+            if len(self._waiters) >= self.max_queue or queued_for_key >= self.per_user * 2:
+                self.shed += 1
+                return False
+            waiter = _Waiter(key, asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_seconds)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # client went away while queued; give back a slot granted meanwhile
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release(key, 0.0)
+            raise
+
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                self.shed += 1
+                return False
+            waited = (time.monotonic() - started) * 1000
+            self.admitted += 1
+            self.wait_ms_total += waited
+            self.wait_ms_max = max(self.wait_ms_max, waited)
+            return True
+
+    def release(self, key: str, service_ms: float) -> None:
+        with self._lock:
+            self._inflight -= 1
+            n = self._by_user.get(key, 1) - 1
+            if n:
+                self._by_user[key] = n
+            else:
+                self._by_user.pop(key, None)
+            self.service_ms_total += service_ms
+
+            # hand freed slots straight to the oldest waiters that can use them
+            for waiter in list(self._waiters):
+                if not self._can_take(waiter.key):
+                    continue
+                self._take(waiter.key)
+                waiter.granted = True
+                self._waiters.remove(waiter)
+                fut = waiter.future
+                fut.get_loop().call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "per_user_limit": self.per_user,
+                "global_limit": self.global_limit,
+                "inflight": self._inflight,
+                "queued": len(self._waiters),
+                "active_users": len(self._by_user),
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "avg_queue_wait_ms": round(self.wait_ms_total / self.admitted, 1) if self.admitted else 0.0,
+                "max_queue_wait_ms": round(self.wait_ms_max, 1),
+            }
+
+
+def _load_classes() -> dict[str, tuple[tuple[str, ...], EndpointLimiter]]:
+    overrides = {}
+    for part in os.getenv("ADMISSION_LIMITS", "").split(","):
+        if "=" in part and "/" in part:
+            name, limits = part.split("=", 1)
+            per_user, global_limit = limits.split("/", 1)
+            overrides[name.strip()] = (int(per_user), int(global_limit))
+
+    classes = {}
+    for name, (prefixes, per_user, global_limit) in DEFAULT_CLASSES.items():
+        per_user, global_limit = overrides.get(name, (per_user, global_limit))
+        classes[name] = (prefixes, EndpointLimiter(name, per_user, global_limit))
+    return classes
+
+
+CLASSES = _load_classes()
+
+
+def classify(path: str) -> EndpointLimiter | None:
+    for prefixes, limiter in CLASSES.values():
+        if path.startswith(prefixes):
+            return limiter
+    return None
+
+
+def snapshot() -> dict:
+    return {name: limiter.snapshot() for name, (_, limiter) in CLASSES.items()}
+
+
+class AdmissionMiddleware:
+    """Holds the endpoint slot until the response body, streamed or not, has been sent."""
+
+    def __init__(self, app, key_func: Callable[[Request], str]):
+        self.app = app
+        self.key_func = key_func
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        limiter = classify(scope["path"])
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        key = self.key_func(Request(scope))
+        if not await limiter.acquire(key):
+            body = json.dumps({"detail": f"Too busy ({limiter.name}); retry shortly"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(limiter.retry_after()).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(key, (time.monotonic() - started) * 1000)
@@ -0,0 +1,229 @@
+"""
+Deterministic delete-account link finder (crawl + anchor scoring).
+"""
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+
+from ..singleflight import SingleFlight
+from . import transport
+from .privacy_finder import _extract_anchors, _fetch, _normalize_base
+
+# (pattern, points, purpose) matched against "<url path> <anchor text>" lowercased
+SIGNALS = [
+    (re.compile(r"delete[\s_-]*(?:my|your)?[\s_-]*account|account[\s/_-]*delet"), 100, "account_delete"),
+    (re.compile(r"close[\s_-]*(?:my|your)?[\s_-]*account|account[\s/_-]*clos"), 90, "account_delete"),
+    (re.compile(r"(?:deactivate|remove|cancel)[\s_-]*(?:my|your)?[\s_-]*account"), 80, "account_delete"),
+    (re.compile(r"delete[\s_-]*(?:my|your)?[\s_-]*(?:data|profile)"), 60, "account_delete"),
+    (re.compile(r"privacy[\s_-]*(?:request|choices|center|centre|rights)|data[\s_-]*(?:subject|request)|do[\s_-]*not[\s_-]*sell|gdpr|ccpa"), 45, "privacy_rights"),
+    (re.compile(r"help|support|faq"), 15, "contact_support"),
+    (re.compile(r"contact"), 10, "contact_support"),
+]
+
+# pages worth probing even when nothing links to them
+COMMON_PATHS = [
+    "/account/delete",
+    "/settings/delete-account",
+    "/delete-account",
+    "/account/close",
+]
+
+# follow these (help-centre, account, privacy) pages one level for deeper anchors
+FOLLOW_RE = re.compile(r"help|support|account|settings|privacy")
+
+PAGE_CONFIRM_RE = re.compile(r"(?:delete|close|deactivate)\s+(?:your\s+|my\s+)?account", re.IGNORECASE)
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+MAX_PAGES = 8
+
+CRAWL_CACHE_TTL_SECONDS = int(os.getenv("DELETE_LINK_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+# no candidate found: maybe the site was briefly down, so crawl again soon
+CRAWL_MISS_TTL_SECONDS = int(os.getenv("DELETE_LINK_MISS_TTL_SECONDS", "300"))
+CRAWL_CACHE_MAX_ENTRIES = int(os.getenv("DELETE_LINK_CACHE_MAX_ENTRIES", "5000"))
+
+PURPOSE_CONFIDENCE = {
+    "account_delete": 0.7,
+    "privacy_rights": 0.45,
+    "contact_support": 0.3,
+}
+
+
+def _on_domain(url: str, domain: str) -> bool:
+    host = urlparse(url).netloc.lower().split(":")[0]
+    return host == domain or host.endswith("." + domain)
+
+
+def _score(url: str, text: str) -> tuple[int, str]:
+    haystack = f"{urlparse(url).path} {text}".lower()
+    best_pts, best_purpose = 0, "unknown"
+    for pattern, pts, purpose in SIGNALS:
+        if pts > best_pts and pattern.search(haystack):
+            best_pts, best_purpose = pts, purpose
+    return best_pts, best_purpose
+
+
+def _title(html: str) -> str:
+    m = TITLE_RE.search(html)
+    return " ".join(m.group(1).split()) if m else ""
+
+
+def find_delete_link_by_crawl(domain: str) -> dict:
+    """DeleteLinkResult for `domain` (normalized, e.g. "netflix.com") from crawling alone."""
+    base = _normalize_base(domain)
+    pages: dict[str, str] = {}  # url -> html, every page fetched successfully
+    # url -> (points, purpose, anchor text)
+    candidates: dict[str, tuple[int, str, str]] = {}
+
+    def consider(html: str, page_url: str) -> None:
+        for href, text in _extract_anchors(html):
+            if href.startswith(("mailto:", "javascript:", "#")):
+                continue
+            url = urljoin(page_url, href).split("#", 1)[0]
+            if not _on_domain(url, domain):
+                continue
+            pts, purpose = _score(url, text)
+            if pts and pts > candidates.get(url, (0,))[0]:
+                candidates[url] = (pts, purpose, text)
+
+    base, homepage = transport.fetch_root(base)
+    if homepage:
+        pages[base] = homepage
+        consider(homepage, base)
+
+    # one level deeper through help/account/privacy pages, best-scoring first
+    follow = sorted(
+        (u for u in candidates if FOLLOW_RE.search(u.lower())),
+        key=lambda u: -candidates[u][0],
+    )
+    for u in follow:
+        if len(pages) >= MAX_PAGES or max((c[0] for c in candidates.values()), default=0) >= 100:
+            break
+        html = _fetch(u)
+        if html:
+            pages[u] = html
+            consider(html, u)
+
+    # nothing obvious linked: probe the usual delete-account locations
+    if max((c[0] for c in candidates.values()), default=0) < 80:
+        for path in COMMON_PATHS:
+            if len(pages) >= MAX_PAGES:
+                break
+            u = urljoin(base, path)
+            if u in pages:
+                continue
+            html = _fetch(u)
+            if html and PAGE_CONFIRM_RE.search(html):
+                pages[u] = html
+                candidates[u] = (85, "account_delete", _title(html))
+                break
+
+    result = {
+        "domain": domain,
+        "best_url": None,
+        "purpose": "unknown",
+        "confidence": 0.0,
+        "steps": [],
+        "evidence": [],
+        "notes": "",
+    }
+    if not candidates:
+        result["notes"] = f"Crawled {len(pages)} page(s) on {domain}; no candidate links."
+        return result
+
+    ranked = sorted(candidates.items(), key=lambda kv: -kv[1][0])
+    best_url, (_, purpose, _) = ranked[0]
+
+    confidence = PURPOSE_CONFIDENCE.get(purpose, 0.0)
+    if purpose == "account_delete":
+        # the page itself talks about deleting the account: strong confirmation
+        html = pages.get(best_url)
+        if html is None:
+            html = _fetch(best_url)
+            if html:
+                pages[best_url] = html
+        if html and PAGE_CONFIRM_RE.search(html):
+            confidence = 0.9
+        elif html is None:
+            confidence = 0.55
+
+    if purpose == "account_delete":
+        steps = [
+            f"Open {best_url}",
+            "Sign in to your account if prompted.",
+            "Follow the on-page instructions to delete or close your account.",
+        ]
+    else:
+        steps = [
+            f"Open {best_url}",
+            "Look for an account deletion or privacy request option.",
+            "If there is none, contact support and ask them to delete your account and personal data.",
+        ]
+
+    result.update(
+        notes=f"Found by crawling {len(pages)} page(s) on {domain}.",
+        best_url=best_url,
+        purpose=purpose,
+        confidence=confidence,
+        steps=steps,
+        evidence=[
+            {"title": t or urlparse(u).path or u, "url": u, "snippet": f"Matched {p}: {t}"[:200]}
+            for u, (_, p, t) in ranked[:3]
+        ],
+    )
+    return result
+
+
+class CrawlCache:
+    """find_delete_link_by_crawl results per domain, kept for a TTL (same scheme as the privacy prefetcher)."""
+
+    def __init__(
+        self,
+        ttl: float = CRAWL_CACHE_TTL_SECONDS,
+        miss_ttl: float = CRAWL_MISS_TTL_SECONDS,
+        max_entries: int = CRAWL_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # domain -> (expires at, result), least recently used first
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._flight = SingleFlight()
+
+    def _cached(self, domain: str) -> dict | None:
+        # caller holds self._lock
+        hit = self._cache.get(domain)
+        if hit is None:
+            return None
+        if time.monotonic() >= hit[0]:
+            del self._cache[domain]
+            return None
+        self._cache.move_to_end(domain)
+        return hit[1]
+
+    def _store(self, domain: str, result: dict) -> None:
+        # caller holds self._lock
+        ttl = self.ttl if result.get("best_url") else self.miss_ttl
+        self._cache[domain] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(domain)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _run(self, domain: str) -> dict:
+        result = find_delete_link_by_crawl(domain)
+        with self._lock:
+            self._store(domain, result)
+        return result
+
+    def lookup(self, domain: str) -> dict:
+        """Cached, joined in-flight, or crawled right now."""
+        with self._lock:
+            hit = self._cached(domain)
+        if hit is None:
+            hit, _ = self._flight.do(domain, self._run, domain)
+        # callers annotate the dict; keep the cached copy pristine
+        return copy.deepcopy(hit)
@@ -1,11 +1,49 @@
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
+from ..state import get_llm_gateway
 
-load_dotenv(override=True)
+LETTER_MODEL = "gpt-4o-mini"
 
-
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+# Static system prompt: kept byte-identical across calls and sent first so the
+# provider can serve it from its prompt-prefix cache.
+LETTER_SYSTEM_PROMPT = (
+    "You generate opt-out request emails under Canada's PIPEDA.\n\n"
+    "CRITICAL RULES\n"
+    "- You MUST NOT guess or invent any email address, website URL, "
+    "privacy policy text, or legal claims about a specific company.\n"
+    "- You MUST NOT claim you \"found\" or \"checked\" anything online.\n"
+    "- You MUST use the EXACT privacy_contact_email provided in the "
+    "user message as the email_address in the output. Do NOT modify it.\n\n"
+    "OUTPUT REQUIREMENTS\n"
+    "Return EXACTLY the following XML format with no additional prose:\n\n"
+    "<result>\n"
+    "  <email_address>USE_THE_EXACT_EMAIL_FROM_USER_MESSAGE</email_address>\n"
+    "  <company_name>USE_THE_EXACT_COMPANY_NAME_FROM_USER_MESSAGE</company_name>\n"
+    "  <email_subject>PIPEDA request: limit third-party sharing "
+    "and access request</email_subject>\n"
+    "  <letter>\n"
+    "...email body here...\n"
+    "  </letter>\n"
+    "</result>\n\n"
+    "LETTER CONTENT RULES\n"
+    "- Write as an email to the privacy/data protection contact.\n"
+    "- Ask them to: stop disclosing/selling/sharing personal "
+    "information to third parties for advertising/analytics/data "
+    "brokerage; limit sharing to service providers strictly necessary; "
+    "provide a list of third parties/categories; confirm completion.\n"
+    "- Request: access to personal information held, purposes, sources, "
+    "retention, and third parties (as allowed under PIPEDA).\n"
+    "- Include: user identifiers ONLY if provided (name/email). "
+    "If not provided, use: \"Account email: [same as this email "
+    "sender]\" and DO NOT invent.\n"
+    "- Be professional and concise (max ~250 words).\n"
+    "- Do not cite or quote any policy text unless the user provided it.\n"
+    "- Do not threaten lawsuits. Do not mention Quebec law unless user "
+    "asked. Reference PIPEDA generally.\n"
+    "- The subject must be one line, e.g. \"PIPEDA request: limit "
+    "third-party sharing and access request\".\n\n"
+    "PARSING SAFETY\n"
+    "- Ensure all tags are present exactly once.\n"
+    "- Do not include angle brackets anywhere except the required tags."
+)
 
 
 def generate_letter_xml(
@@ -35,67 +73,16 @@ def generate_letter_xml(
     
     user_message += "\nGenerate the letter in the required XML format."
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You generate opt-out request emails under Canada's PIPEDA.\n\n"
-                    "CRITICAL RULES\n"
-                    "- You MUST NOT guess or invent any email address, website URL, "
-                    "privacy policy text, or legal claims about a specific company.\n"
-                    "- You MUST NOT claim you \"found\" or \"checked\" anything online.\n"
-                    "- You MUST use the EXACT privacy_contact_email provided in the "
-                    "user message as the email_address in the output. Do NOT modify it.\n\n"
-                    "OUTPUT REQUIREMENTS\n"
-                    "Return EXACTLY the following XML format with no additional prose:\n\n"
-                    "<result>\n"
-                    "  <email_address>USE_THE_EXACT_EMAIL_FROM_USER_MESSAGE</email_address>\n"
-                    "  <company_name>USE_THE_EXACT_COMPANY_NAME_FROM_USER_MESSAGE</company_name>\n"
-                    "  <email_subject>PIPEDA request: limit third-party sharing "
-                    "and access request</email_subject>\n"
-                    "  <letter>\n"
-                    "...email body here...\n"
-                    "  </letter>\n"
-                    "</result>\n\n"
-                    "LETTER CONTENT RULES\n"
-                    "- Write as an email to the privacy/data protection contact.\n"
-                    "- Ask them to: stop disclosing/selling/sharing personal "
-                    "information to third parties for advertising/analytics/data "
-                    "brokerage; limit sharing to service providers strictly necessary; "
-                    "provide a list of third parties/categories; confirm completion.\n"
-                    "- Request: access to personal information held, purposes, sources, "
-                    "retention, and third parties (as allowed under PIPEDA).\n"
-                    "- Include: user identifiers ONLY if provided (name/email). "
-                    "If not provided, use: \"Account email: [same as this email "
-                    "sender]\" and DO NOT invent.\n"
-                    "- Be professional and concise (max ~250 words).\n"
-                    "- Do not cite or quote any policy text unless the user provided it.\n"
-                    "- Do not threaten lawsuits. Do not mention Quebec law unless user "
-                    "asked. Reference PIPEDA generally.\n"
-                    "- The subject must be one line, e.g. \"PIPEDA request: limit "
-                    "third-party sharing and access request\".\n\n"
-                    "PARSING SAFETY\n"
-                    "- Ensure all tags are present exactly once.\n"
-                    "- Do not include angle brackets anywhere except the required tags."
-                ),
-            },
-            {
-                "role": "user",
-                "content": user_message,
-            }
-        ]
+    content = get_llm_gateway().complete(
+        site="letter.generate",
+        model=LETTER_MODEL,
+        system=LETTER_SYSTEM_PROMPT,
+        user=user_message,
     )
-    
-    if not response.choices or len(response.choices) == 0:
-        raise ValueError("No response from OpenAI API")
-    
-    content = response.choices[0].message.content or ""
-    
+
     if not content:
         raise ValueError("Empty response content from OpenAI API")
-    
+
     return content
 
 
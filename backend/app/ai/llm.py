@@ -0,0 +1,235 @@
+"""
+Shared LLM gateway: pooled client, per-model concurrency limits, coalescing and usage accounting.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from ..profiling import stage
+from ..singleflight import SingleFlight
+
+DEFAULT_MODEL_CONCURRENCY = {
+    "gpt-4o-mini": 8,
+    "gpt-4.1-mini": 4,
+}
+
+
+class LLMUnavailable(RuntimeError):
+    """No concurrency slot for the model freed up within the queue timeout."""
+
+
+@dataclass(frozen=True)
+class LLMRequest:
+    model: str
+    system: str
+    user: str
+    tools: tuple = ()
+    temperature: float | None = None
+
+    def key(self) -> str:
+        raw = json.dumps(
+            [self.model, self.system, self.user, list(self.tools), self.temperature],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+
+@dataclass
+class LLMResult:
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+
+
+@dataclass
+class SiteUsage:
+    calls: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_input_tokens: int = 0
+    latency_ms_total: float = 0.0
+
+
+def _parse_concurrency(raw: str) -> dict[str, int]:
+    # "gpt-4o-mini=8,gpt-4.1-mini=4"
+    out = {}
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        model, n = part.split("=", 1)
+        out[model.strip()] = max(1, int(n))
+    return out
+
+
+class OpenAIBackend:
+    """Talks to the real API through the shared client from app.state."""
+
+    def __init__(self, timeout: float, max_retries: int):
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def complete(self, req: LLMRequest) -> LLMResult:
+        from ..state import get_openai_client
+
+        client = get_openai_client().with_options(timeout=self.timeout, max_retries=self.max_retries)
+        messages = [
+            {"role": "system", "content": req.system},
+            {"role": "user", "content": req.user},
+        ]
+        extra = {} if req.temperature is None else {"temperature": req.temperature}
+
+        if req.tools:
+            # tool use (web_search) is only available on the Responses API
+            resp = client.responses.create(model=req.model, tools=list(req.tools), input=messages, **extra)
+            usage = resp.usage
+            details = getattr(usage, "input_tokens_details", None)
+            return LLMResult(
+                text=resp.output_text or "",
+                input_tokens=getattr(usage, "input_tokens", 0) or 0,
+                output_tokens=getattr(usage, "output_tokens", 0) or 0,
+                cached_input_tokens=getattr(details, "cached_tokens", 0) or 0,
+            )
+
+        resp = client.chat.completions.create(model=req.model, messages=messages, **extra)
+        if not resp.choices:
+            raise ValueError("No response from OpenAI API")
+        usage = resp.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        return LLMResult(
+            text=resp.choices[0].message.content or "",
+            input_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            output_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_input_tokens=getattr(details, "cached_tokens", 0) or 0,
+        )
+
+
+class FakeLLMBackend:
+    """Local stand-in for tests and offline dev; records every request it sees."""
+
+    def __init__(self, responder: Callable[[LLMRequest], str] | None = None, latency: float = 0.0):
+        self.responder = responder or (lambda req: "")
+        self.latency = latency
+        self.requests: list[LLMRequest] = []
+
+    def complete(self, req: LLMRequest) -> LLMResult:
+        self.requests.append(req)
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.responder(req)
+        return LLMResult(text=text, input_tokens=len(req.system + req.user) // 4, output_tokens=len(text) // 4)
+
+
+@dataclass
+class LLMGateway:
+    backend: object
+    model_concurrency: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MODEL_CONCURRENCY))
+    default_concurrency: int = 4
+    queue_timeout: float = 10.0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._flight = SingleFlight()
+        self._usage: dict[str, SiteUsage] = {}
+
+    def use_backend(self, backend) -> None:
+        self.backend = backend
+
+    def _slot(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._slots.get(model)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.model_concurrency.get(model, self.default_concurrency))
+                self._slots[model] = sem
+            return sem
+
+    def _site(self, site: str) -> SiteUsage:
+        # caller holds self._lock
+        usage = self._usage.get(site)
+        if usage is None:
+            usage = self._usage[site] = SiteUsage()
+        return usage
+
+    def complete(
+        self,
+        site: str,
+        model: str,
+        system: str,
+        user: str,
+        tools: list[dict] | None = None,
+        temperature: float | None = None,
+    ) -> str:
+        """Run one prompt and return the output text.
+
+        `system` must be the static part of the prompt (same for every call from
+        a site); everything request-specific belongs in `user`.
+        """
+        req = LLMRequest(
+            model=model,
+            system=system,
+            user=user,
+            tools=tuple(tools or ()),
+            temperature=temperature,
+        )
+        text, shared = self._flight.do(req.key(), lambda: self._call(site, req).text)
+        if shared:
+            with self._lock:
+                self._site(site).coalesced += 1
+        return text
+
+    def _call(self, site: str, req: LLMRequest) -> LLMResult:
+        sem = self._slot(req.model)
+        if not sem.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._site(site).errors += 1
+            raise LLMUnavailable(f"LLM busy: no {req.model} slot within {self.queue_timeout:.0f}s")
+
+        started = time.perf_counter()
+        try:
+            with stage(f"llm.{site}"):
+                result = self.backend.complete(req)
+        except Exception:
+            with self._lock:
+                self._site(site).errors += 1
+            raise
+        finally:
+            sem.release()
+
+        with self._lock:
+            usage = self._site(site)
+            usage.calls += 1
+            usage.input_tokens += result.input_tokens
+            usage.output_tokens += result.output_tokens
+            usage.cached_input_tokens += result.cached_input_tokens
+            usage.latency_ms_total += (time.perf_counter() - started) * 1000
+        return result
+
+    def usage(self) -> dict[str, dict]:
+        with self._lock:
+            return {site: dict(vars(u)) for site, u in self._usage.items()}
+
+
+def build_gateway() -> LLMGateway:
+    timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    if os.getenv("LLM_BACKEND", "openai") == "fake":
+        backend = FakeLLMBackend()
+    else:
+        backend = OpenAIBackend(timeout=timeout, max_retries=max_retries)
+
+    concurrency = dict(DEFAULT_MODEL_CONCURRENCY)
+    concurrency.update(_parse_concurrency(os.getenv("LLM_CONCURRENCY", "")))
+    return LLMGateway(
+        backend=backend,
+        model_concurrency=concurrency,
+        default_concurrency=int(os.getenv("LLM_DEFAULT_CONCURRENCY", "4")),
+        queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+    )
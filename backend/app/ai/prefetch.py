@@ -0,0 +1,137 @@
+"""
+Background warm-up of privacy discovery for freshly scanned domains.
+"""
+import copy
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from ..singleflight import SingleFlight
+from .privacy_finder import _normalize_base, find_privacy_policy_and_email
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "10"))
+CACHE_TTL_SECONDS = int(os.getenv("PRIVACY_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+# no policy found: maybe the site was briefly down, so look again soon
+MISS_TTL_SECONDS = int(os.getenv("PRIVACY_MISS_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("PRIVACY_CACHE_MAX_ENTRIES", "5000"))
+
+CONFIDENCE_RANK = {"high": 0, "medium": 1, "low": 2}
+
+# queue priorities (lower runs first)
+PRIORITY_WARM = 10
+
+
+def rank_for_prefetch(results: list[dict], top_n: int = PREFETCH_TOP_N) -> list[str]:
+    """Domains most likely to be clicked next: highest confidence, then most recent."""
+    ranked = sorted(results, key=lambda r: r.get("lastSeen") or "", reverse=True)
+    ranked.sort(key=lambda r: CONFIDENCE_RANK.get(r.get("confidence"), 3))
+    return [r["domain"] for r in ranked[:top_n] if r.get("domain")]
+
+
+class PrivacyPrefetcher:
+    def __init__(
+        self,
+        workers: int = PREFETCH_WORKERS,
+        ttl: float = CACHE_TTL_SECONDS,
+        miss_ttl: float = MISS_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+    ):
+        self.workers = workers
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._interactive = 0
+        # base -> (expires at, result), least recently used first
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._flight = SingleFlight()
+        self._queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=1000)
+        self._seq = itertools.count()
+        self._threads: list[threading.Thread] = []
+
+    def _cached(self, base: str) -> dict | None:
+        # caller holds self._lock
+        hit = self._cache.get(base)
+        if hit is None:
+            return None
+        if time.monotonic() >= hit[0]:
+            del self._cache[base]
+            return None
+        self._cache.move_to_end(base)
+        return hit[1]
+
+    def _store(self, base: str, result: dict) -> None:
+        # caller holds self._lock
+        ttl = self.ttl if result.get("privacy_policy_url") else self.miss_ttl
+        self._cache[base] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(base)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _run(self, base: str, url: str) -> dict:
+        result = find_privacy_policy_and_email(url)
+        with self._lock:
+            self._store(base, result)
+        return result
+
+    def lookup(self, company_website_url: str) -> dict:
+        """Interactive lookup: cached, joined in-flight, or run right now."""
+        base = _normalize_base(company_website_url)
+        with self._lock:
+            hit = self._cached(base)
+            if hit is not None:
+                return copy.deepcopy(hit)
+            self._interactive += 1
+
+        try:
+            result, _ = self._flight.do(base, self._run, base, company_website_url)
+        finally:
+            with self._lock:
+                self._interactive -= 1
+                if not self._interactive:
+                    self._idle.notify_all()
+        # callers annotate the dict; keep the cached copy pristine
+        return copy.deepcopy(result)
+
+    def warm(self, domains: list[str]) -> None:
+        """Queue background discovery for `domains` (best effort, never blocks)."""
+        self._ensure_workers()
+        for domain in domains:
+            url = f"https://{domain}"
+            base = _normalize_base(url)
+            with self._lock:
+                if self._cached(base) is not None or base in self._flight:
+                    continue
+            try:
+                self._queue.put_nowait((PRIORITY_WARM, next(self._seq), url))
+            except queue.Full:
+                return
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(max(1, self.workers)):
+                t = threading.Thread(target=self._worker, name=f"privacy-prefetch-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self) -> None:
+        while True:
+            _, _, url = self._queue.get()
+            base = _normalize_base(url)
+            with self._lock:
+                # yield to interactive lookups
+                while self._interactive:
+                    self._idle.wait()
+                if self._cached(base) is not None or base in self._flight:
+                    continue
+            try:
+                self._flight.do(base, self._run, base, url)
+            except Exception:
+                pass  # best effort; an interactive lookup will retry
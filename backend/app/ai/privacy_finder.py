@@ -1,7 +1,8 @@
 import re
 from urllib.parse import urljoin, urlparse
 
-import requests
+from . import transport
+from ..profiling import stage
 
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}")
 
@@ -40,29 +41,39 @@ def _normalize_base(url: str) -> str:
     return base
 
 
-def _fetch(url: str, timeout: int = 10) -> str | None:
-    try:
-        r = requests.get(
-            url,
-            timeout=timeout,
-            headers={"User-Agent": "Mozilla/5.0 (hackathon; privacy-finder)"},
-            allow_redirects=True,
-        )
-        if r.status_code >= 400:
-            return None
-        return r.text or ""
-    except Exception:
-        return None
+def _fetch(url: str) -> str | None:
+    # deadlines, per-host circuit breaking: see transport.py
+    return transport.fetch(url)
 
 
 def _extract_links(html: str) -> list[str]:
     # naive href extractor, avoids extra deps
     # captures href="..." or href='...'
     pattern = r'href\s*=\s*["\']([^"\']+)["\']'
-    hrefs = re.findall(pattern, html, flags=re.IGNORECASE)
+    with stage("regex.links"):
+        hrefs = re.findall(pattern, html, flags=re.IGNORECASE)
     return hrefs
 
 
+ANCHOR_RE = re.compile(r"<a\b[^>]*?href\s*=\s*[\"']([^\"']+)[\"'][^>]*>(.*?)</a>", re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _extract_anchors(html: str) -> list[tuple[str, str]]:
+    # (href, visible text) pairs; same naive approach as _extract_links
+    out = []
+    with stage("regex.anchors"):
+        for href, inner in ANCHOR_RE.findall(html):
+            text = " ".join(TAG_RE.sub(" ", inner).split())
+            out.append((href, text))
+    return out
+
+
+def _extract_emails(html: str) -> list[str]:
+    with stage("regex.emails"):
+        return EMAIL_RE.findall(html)
+
+
 def _is_same_domain(base: str, candidate: str) -> bool:
     b = urlparse(base).netloc
     c = urlparse(candidate).netloc
@@ -83,7 +94,7 @@ def find_privacy_policy_and_email(company_website_url: str) -> dict:
     """
     Returns dict:
       {
-        "base_url": ...,
+        "base_url": ...,   # the site asked for, even if its homepage redirected elsewhere
         "privacy_policy_url": str|None,
         "privacy_contact_email": str|None,
         "candidates": { "emails": [...], "pages_checked": [...] }
@@ -95,11 +106,12 @@ def find_privacy_policy_and_email(company_website_url: str) -> dict:
     email_candidates: set[str] = set()
     policy_url: str | None = None
 
-    # 1) fetch homepage and discover relevant links
-    homepage = _fetch(base)
+    # 1) fetch homepage (hedged across www/apex/http) and discover relevant links;
+    # crawl the host it landed on, but keep reporting `base`
+    root, homepage = transport.fetch_root(base)
     if homepage:
-        pages_checked.append(base)
-        for e in EMAIL_RE.findall(homepage):
+        pages_checked.append(root)
+        for e in _extract_emails(homepage):
             email_candidates.add(e)
 
         hrefs = _extract_links(homepage)
@@ -110,8 +122,8 @@ def find_privacy_policy_and_email(company_website_url: str) -> dict:
                 continue
             keywords = ["privacy", "legal", "terms", "contact"]
             if any(k in h.lower() for k in keywords):
-                abs_url = urljoin(base, h)
-                if _is_same_domain(base, abs_url):
+                abs_url = urljoin(root, h)
+                if _is_same_domain(root, abs_url):
                     likely.append(abs_url)
 
         # de-dupe, keep small
@@ -135,14 +147,14 @@ def find_privacy_policy_and_email(company_website_url: str) -> dict:
             if policy_url is None and "privacy" in u.lower():
                 policy_url = u
 
-            for e in EMAIL_RE.findall(html):
+            for e in _extract_emails(html):
                 email_candidates.add(e)
 
     # 3) if still missing, try common paths directly
     for path in COMMON_PATHS:
         if len(pages_checked) >= 12:
             break
-        u = urljoin(base, path)
+        u = urljoin(root, path)
         if u in pages_checked:
             continue
         html = _fetch(u)
@@ -153,7 +165,7 @@ def find_privacy_policy_and_email(company_website_url: str) -> dict:
         if policy_url is None and "privacy" in path:
             policy_url = u
 
-        for e in EMAIL_RE.findall(html):
+        for e in _extract_emails(html):
             email_candidates.add(e)
 
     # 4) pick best privacy email
@@ -172,7 +184,7 @@ def find_privacy_policy_and_email(company_website_url: str) -> dict:
     if not best_email and policy_url:
         privacy_html = _fetch(policy_url)
         if privacy_html:
-            privacy_emails = EMAIL_RE.findall(privacy_html)
+            privacy_emails = _extract_emails(privacy_html)
             if privacy_emails:
                 scored = sorted(
                     [(e, _score_email(e)) for e in privacy_emails],
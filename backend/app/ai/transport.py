@@ -0,0 +1,140 @@
+"""
+HTTP transport for the privacy crawler: split deadlines, per-host circuit breakers, hedged root fetches.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from ..profiling import bind, stage
+from ..state import get_http_session
+
+CONNECT_TIMEOUT = float(os.getenv("CRAWL_CONNECT_TIMEOUT_SECONDS", "3"))
+READ_TIMEOUT = float(os.getenv("CRAWL_READ_TIMEOUT_SECONDS", "8"))
+BREAKER_FAILURES = int(os.getenv("CRAWL_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("CRAWL_BREAKER_COOLDOWN_SECONDS", "120"))
+HEDGE_DELAY_SECONDS = float(os.getenv("CRAWL_HEDGE_DELAY_SECONDS", "0.3"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="crawl-hedge")
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                # let exactly one probe through
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.max_failures:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    with _breakers_lock:
+        b = _breakers.get(host)
+        if b is None:
+            b = _breakers[host] = CircuitBreaker()
+        return b
+
+
+def breaker_states() -> dict[str, dict]:
+    """Non-closed breakers, for diagnostics."""
+    with _breakers_lock:
+        items = list(_breakers.items())
+    return {h: {"state": b.state, "failures": b.failures} for h, b in items if b.state != CLOSED}
+
+
+def _get(url: str) -> tuple[str, str] | None:
+    """(final url, body) for a 2xx/3xx answer; None otherwise or when the host's breaker is open."""
+    import requests
+
+    host = urlparse(url).netloc.lower()
+    breaker = breaker_for(host)
+    if not breaker.allow():
+        return None
+
+    try:
+        with stage("crawl.fetch"):
+            r = get_http_session().get(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), allow_redirects=True)
+    except (requests.Timeout, requests.ConnectionError):
+        breaker.record_failure()
+        return None
+    except Exception:
+        # malformed URL, too many redirects...: the page's fault, not the host's
+        breaker.record_success()
+        return None
+
+    if r.status_code >= 500:
+        breaker.record_failure()
+        return None
+    breaker.record_success()
+    if r.status_code >= 400:
+        return None
+    return r.url, r.text or ""
+
+
+def fetch(url: str) -> str | None:
+    got = _get(url)
+    return got[1] if got else None
+
+
+def root_variants(base: str) -> list[str]:
+    """https apex/www and http variants of a site root, preferred first."""
+    host = urlparse(base).netloc.lower()
+    apex = host[4:] if host.startswith("www.") else host
+    first, second = (host, apex) if host.startswith("www.") else (apex, f"www.{apex}")
+    return [f"https://{first}", f"https://{second}", f"http://{first}"]
+
+
+def fetch_root(base: str, hedge_delay: float = HEDGE_DELAY_SECONDS) -> tuple[str, str | None]:
+    """Hedged fetch of a site's homepage.
+
+    Starts the preferred variant, adds the next one every `hedge_delay`
+    seconds while nothing good has come back, and returns
+    (base URL of the winning answer, html) - or (base, None) if all fail.
+    """
+    variants = root_variants(base)
+    pending = set()
+    next_variant = 0
+    while True:
+        if next_variant < len(variants):
+            pending.add(_hedge_pool.submit(bind(_get), variants[next_variant]))
+            next_variant += 1
+        if not pending:
+            return base, None
+        timeout = hedge_delay if next_variant < len(variants) else None
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            got = fut.result()
+            if got:
+                final_url, html = got
+                parsed = urlparse(final_url)
+                return f"{parsed.scheme}://{parsed.netloc}", html
@@ -0,0 +1,107 @@
+"""
+Resumable batch scanning of many linked mailboxes (`python -m app.batch_scan --help`).
+"""
+import argparse
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from . import store
+from .quota import budget_for
+from .routes.gmail import TOK_DIR, load_creds
+from .routes.gmail_scan import scan_mailbox
+from .state import gmail_service
+
+DEFAULT_WORKERS = int(os.getenv("BATCH_SCAN_WORKERS", str(min(32, (os.cpu_count() or 1) * 4))))
+
+
+def list_sessions() -> list[str]:
+    """Every session with stored Gmail credentials."""
+    if not TOK_DIR.exists():
+        return []
+    return sorted(p.stem for p in TOK_DIR.glob("*.json"))
+
+
+def scan_session(run_id: str, session_id: str, years: int = 1, limit: int = 300) -> dict:
+    store.checkpoint(run_id, session_id, "running")
+    try:
+        creds = load_creds(session_id)
+        if not creds:
+            raise RuntimeError("Not connected to Gmail")
+        results = scan_mailbox(
+            lambda: gmail_service(creds),
+            years=years,
+            limit=limit,
+            quota=budget_for(session_id),
+            num_retries=3,
+        )
+        # the same key the API reads them back under (see sessions.user_key)
+        store.save_scan_results(store.user_for_session(session_id) or f"gmail:{session_id}", results)
+    except Exception as e:
+        store.checkpoint(run_id, session_id, "failed", error=str(e)[:500])
+        return {"session_id": session_id, "status": "failed", "error": str(e)}
+
+    store.checkpoint(run_id, session_id, "done", accounts=len(results))
+    return {"session_id": session_id, "status": "done", "accounts": len(results)}
+
+
+def run_batch(
+    session_ids: list[str],
+    run_id: str | None = None,
+    years: int = 1,
+    limit: int = 300,
+    workers: int = DEFAULT_WORKERS,
+    processes: bool = False,
+) -> dict:
+    """Scan `session_ids`, skipping any already completed under `run_id`."""
+    run_id = run_id or f"batch-{int(time.time())}-{secrets.token_hex(3)}"
+    done = store.completed_sessions(run_id)
+    todo = [s for s in dict.fromkeys(session_ids) if s not in done]
+
+    started = time.perf_counter()
+    counts = {"done": 0, "failed": 0, "skipped": len(session_ids) - len(todo)}
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_cls(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(scan_session, run_id, s, years, limit) for s in todo]
+        for fut in as_completed(futures):
+            counts[fut.result()["status"]] += 1
+
+    return {
+        "run_id": run_id,
+        "counts": counts,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+
+    parser = argparse.ArgumentParser(description="Scan many linked Gmail mailboxes into the results store.")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--sessions", nargs="+", help="token-store session ids to scan")
+    who.add_argument("--all", action="store_true", help="scan every session in the token store")
+    parser.add_argument("--run-id", help="reuse to resume an interrupted run")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    args = parser.parse_args()
+
+    sessions = list_sessions() if args.all else args.sessions
+    summary = run_batch(
+        sessions,
+        run_id=args.run_id,
+        years=args.years,
+        limit=args.limit,
+        workers=args.workers,
+        processes=args.processes,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Header-only Gmail fetch path, with date-sharded listing for long windows.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from .profiling import bind, stage
+from .quota import QuotaBudget
+
+LIST_FIELDS = "messages/id,nextPageToken"
+HEADER_FIELDS = "id,internalDate,payload/headers"
+
+SCAN_HEADERS = ("From", "Subject")
+
+PAGE_SIZE = 500
+DAY = 24 * 60 * 60
+SHARD_SECONDS = int(os.getenv("GMAIL_SHARD_DAYS", "180")) * DAY
+MIN_SHARD_SECONDS = DAY
+FETCH_WORKERS = int(os.getenv("GMAIL_FETCH_WORKERS", "8"))
+
+
+class MessageHeaders:
+    __slots__ = ("id", "internal_date", "from_", "subject", "snippet")
+
+    def __init__(self, id: str, internal_date: int, from_: str = "", subject: str = "", snippet: str = ""):
+        self.id = id
+        self.internal_date = internal_date  # ms since epoch, when Gmail received it
+        self.from_ = from_
+        self.subject = subject
+        self.snippet = snippet
+
+    @classmethod
+    def from_resource(cls, msg: dict) -> "MessageHeaders":
+        from_ = subject = ""
+        for h in msg.get("payload", {}).get("headers", ()):
+            name = h.get("name", "").lower()
+            if name == "from":
+                from_ = h.get("value") or ""
+            elif name == "subject":
+                subject = h.get("value") or ""
+        return cls(
+            id=msg.get("id", ""),
+            internal_date=int(msg.get("internalDate") or 0),
+            from_=from_,
+            subject=subject,
+            snippet=msg.get("snippet", ""),
+        )
+
+    @property
+    def received_at(self) -> datetime | None:
+        if not self.internal_date:
+            return None
+        return datetime.fromtimestamp(self.internal_date / 1000, tz=timezone.utc)
+
+
+def list_page(
+    service,
+    q: str | None = None,
+    max_results: int = 100,
+    page_token: str | None = None,
+    quota: QuotaBudget | None = None,
+    num_retries: int = 0,
+) -> tuple[list[str], str | None]:
+    """One messages.list page: (ids newest first, next page token)."""
+    if quota:
+        quota.charge("messages.list")
+    kwargs = {"userId": "me", "maxResults": min(max_results, PAGE_SIZE), "fields": LIST_FIELDS}
+    if q:
+        kwargs["q"] = q
+    if page_token:
+        kwargs["pageToken"] = page_token
+    with stage("gmail.list"):
+        listing = service.users().messages().list(**kwargs).execute(num_retries=num_retries)
+    return [m["id"] for m in listing.get("messages", [])], listing.get("nextPageToken")
+
+
+def list_message_ids(
+    service,
+    q: str | None = None,
+    max_results: int = 100,
+    quota: QuotaBudget | None = None,
+    num_retries: int = 0,
+) -> list[str]:
+    ids, _ = list_page(service, q=q, max_results=max_results, quota=quota, num_retries=num_retries)
+    return ids
+
+
+def _thread_services(make_service: Callable[[], Any]) -> Callable[[], Any]:
+    # Gmail service objects are not thread-safe; give each worker its own
+    local = threading.local()
+
+    def get():
+        svc = getattr(local, "service", None)
+        if svc is None:
+            svc = local.service = make_service()
+        return svc
+
+    return get
+
+
+def list_message_ids_sharded(
+    make_service: Callable[[], Any],
+    terms: str,
+    years: int,
+    limit: int,
+    quota: QuotaBudget | None = None,
+    num_retries: int = 0,
+    workers: int = FETCH_WORKERS,
+    shard_seconds: int = SHARD_SECONDS,
+) -> list[str]:
+    """Newest `limit` ids matching `terms` in the last `years`, listed as parallel date shards.
+
+    A shard whose first page comes back full is split in half and both halves
+    are listed again, so dense periods get narrow shards and sparse ones stay
+    wide. Shards narrower than a day are paged instead. Results are merged
+    newest-first and deduplicated by id.
+    """
+    end = int(time.time()) + DAY  # before: is exclusive; cover today fully
+    start = end - years * 365 * DAY - DAY
+    service = _thread_services(make_service)
+
+    @bind
+    def list_shard(lo: int, hi: int, page_token: str | None = None):
+        q = f"{terms} after:{lo} before:{hi}"
+        ids, token = list_page(
+            service(),
+            q=q,
+            max_results=min(limit, PAGE_SIZE),
+            page_token=page_token,
+            quota=quota,
+            num_retries=num_retries,
+        )
+        return lo, hi, ids, token
+
+    # (shard end, shard start, ids) - sorted newest first at the end
+    found: list[tuple[int, int, list[str]]] = []
+    per_shard: dict[tuple[int, int], int] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = set()
+        hi = end
+        while hi > start:
+            lo = max(start, hi - shard_seconds)
+            pending.add(pool.submit(list_shard, lo, hi))
+            hi = lo
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                lo, hi, ids, token = fut.result()
+                found.append((hi, lo, ids))
+                seen = per_shard[(lo, hi)] = per_shard.get((lo, hi), 0) + len(ids)
+                # a shard never needs more than `limit` ids: they are its newest
+                if not token or seen >= limit:
+                    continue
+                if hi - lo > MIN_SHARD_SECONDS:
+                    mid = lo + (hi - lo) // 2
+                    pending.add(pool.submit(list_shard, lo, mid))
+                    pending.add(pool.submit(list_shard, mid, hi))
+                else:
+                    pending.add(pool.submit(list_shard, lo, hi, token))
+
+    # Newer shards first; for equal ends the narrower (newer-starting) shard
+    # first, so a split shard's own page slots in between its two halves.
+    found.sort(key=lambda f: (-f[0], -f[1]))
+    out: list[str] = []
+    seen_ids: set[str] = set()
+    for _, _, ids in found:
+        for msg_id in ids:
+            if msg_id not in seen_ids:
+                seen_ids.add(msg_id)
+                out.append(msg_id)
+    return out[:limit]
+
+
+def get_headers(
+    service,
+    msg_id: str,
+    headers: tuple[str, ...] = SCAN_HEADERS,
+    quota: QuotaBudget | None = None,
+    num_retries: int = 0,
+    with_snippet: bool = False,
+) -> MessageHeaders:
+    if quota:
+        quota.charge("messages.get")
+    with stage("gmail.get"):
+        msg = service.users().messages().get(
+            userId="me",
+            id=msg_id,
+            format="metadata",
+            metadataHeaders=list(headers),
+            fields=HEADER_FIELDS + (",snippet" if with_snippet else ""),
+        ).execute(num_retries=num_retries)
+    return MessageHeaders.from_resource(msg)
+
+
+def get_headers_many(
+    make_service: Callable[[], Any],
+    ids: list[str],
+    quota: QuotaBudget | None = None,
+    num_retries: int = 0,
+    workers: int = FETCH_WORKERS,
+) -> list[MessageHeaders]:
+    """`get_headers` for many ids on a small pool (one service per worker), in input order."""
+    service = _thread_services(make_service)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        fetch = bind(lambda i: get_headers(service(), i, quota=quota, num_retries=num_retries))
+        return list(pool.map(fetch, ids))
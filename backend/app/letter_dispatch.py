@@ -0,0 +1,249 @@
+"""
+Sending stored opt-out letters through a per-user, idempotent send queue (LETTER_DISPATCH_ENABLED=1).
+"""
+import base64
+import hashlib
+import os
+import smtplib
+import socket
+import threading
+from email.message import EmailMessage
+from typing import Any, Protocol
+
+from . import store
+from .quota import budget_for, send_budget_for
+
+GMAIL_SEND_SCOPE = "https://www.googleapis.com/auth/gmail.send"
+DISPATCH_ENABLED = os.getenv("LETTER_DISPATCH_ENABLED", "0").lower() in ("1", "true", "yes")
+# gmail (the user's own account), smtp (relay at SMTP_HOST:SMTP_PORT) or fake (in memory)
+DISPATCH_TRANSPORT = os.getenv("LETTER_DISPATCH_TRANSPORT", "gmail")
+DISPATCH_BATCH_SIZE = int(os.getenv("LETTER_DISPATCH_BATCH_SIZE", "25"))
+MAX_ATTEMPTS = 3
+MESSAGE_ID_DOMAIN = os.getenv("LETTER_MESSAGE_ID_DOMAIN", "spypry.local")
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "0").lower() in ("1", "true", "yes")
+SMTP_FROM = os.getenv("SMTP_FROM", "privacy-requests@localhost")
+
+
+class TransientSendError(RuntimeError):
+    """Nothing was sent (throttled, refused, couldn't connect); safe to retry."""
+
+
+class SendOutcomeUnknown(RuntimeError):
+    """The message may have been accepted (5xx, timeout, connection lost mid-send); never resent."""
+
+
+def idempotency_key(letter_id: int) -> str:
+    return f"letter:{letter_id}"
+
+
+def message_id(row: dict) -> str:
+    """Same for every attempt at one queued letter, so a resend is recognisable."""
+    digest = hashlib.sha256(f"{row['user_key']}\x1f{row['idempotency_key']}".encode()).hexdigest()[:32]
+    return f"<optout-{digest}@{MESSAGE_ID_DOMAIN}>"
+
+
+def build_messages(rows: list[dict], sender: str | None) -> list[EmailMessage]:
+    """MIME messages for one claimed batch, built before any of it is sent."""
+    out = []
+    for row in rows:
+        msg = EmailMessage()
+        if sender:
+            msg["From"] = sender
+        msg["To"] = row["email_address"]
+        msg["Subject"] = row["email_subject"]
+        msg["Message-ID"] = message_id(row)
+        msg.set_content(row["letter"])
+        out.append(msg)
+    return out
+
+
+class MailTransport(Protocol):
+    sender: str | None
+
+    def send(self, msg: EmailMessage) -> str: ...
+
+    def close(self) -> None: ...
+
+
+class GmailTransport:
+    # Gmail fills in From from the authenticated account
+    sender = None
+
+    def __init__(self, creds: Any):
+        from .state import gmail_service
+
+        self._service = gmail_service(creds)
+
+    def send(self, msg: EmailMessage) -> str:
+        from googleapiclient.errors import HttpError
+
+        raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
+        try:
+            # no num_retries: a re-POST after a 5xx or timeout may deliver the letter twice;
+            # the queue decides whether to try again
+            sent = self._service.users().messages().send(userId="me", body={"raw": raw}).execute()
+        except HttpError as e:
+            if e.resp.status == 429:
+                raise TransientSendError(str(e)) from e
+            if e.resp.status >= 500:
+                raise SendOutcomeUnknown(str(e)) from e
+            raise
+        except (ConnectionRefusedError, socket.gaierror) as e:
+            raise TransientSendError(str(e)) from e
+        except (ConnectionError, TimeoutError) as e:
+            raise SendOutcomeUnknown(str(e)) from e
+        return sent["id"]
+
+    def close(self) -> None:
+        pass
+
+
+class SMTPTransport:
+    def __init__(self):
+        self.sender = SMTP_FROM
+        self._conn: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._conn is not None:
+            try:
+                # servers drop idle connections; find out before sending anything
+                if self._conn.noop()[0] != 250:
+                    self.close()
+            except (smtplib.SMTPException, OSError):
+                self._conn = None
+        if self._conn is None:
+            conn = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+            if SMTP_STARTTLS:
+                conn.starttls()
+            if SMTP_USERNAME:
+                conn.login(SMTP_USERNAME, SMTP_PASSWORD or "")
+            self._conn = conn
+        return self._conn
+
+    def send(self, msg: EmailMessage) -> str:
+        try:
+            conn = self._connect()
+        except (smtplib.SMTPException, OSError) as e:
+            self._conn = None
+            raise TransientSendError(str(e)) from e
+        try:
+            conn.send_message(msg)
+        except smtplib.SMTPResponseException as e:
+            # an explicit rejection: the server did not take the message
+            if 400 <= e.smtp_code < 500:
+                raise TransientSendError(str(e)) from e
+            raise
+        except (smtplib.SMTPServerDisconnected, OSError) as e:
+            self._conn = None
+            raise SendOutcomeUnknown(str(e)) from e
+        return msg["Message-ID"]
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except smtplib.SMTPException:
+                pass
+            self._conn = None
+
+
+class FakeMailTransport:
+    """Records every message instead of sending it."""
+
+    sent: list[EmailMessage] = []
+
+    def __init__(self, sender: str | None = "fake@localhost"):
+        self.sender = sender
+
+    def send(self, msg: EmailMessage) -> str:
+        FakeMailTransport.sent.append(msg)
+        return f"fake-{len(FakeMailTransport.sent)}"
+
+    def close(self) -> None:
+        pass
+
+
+def make_transport(session_id: str) -> MailTransport:
+    if DISPATCH_TRANSPORT == "smtp":
+        return SMTPTransport()
+    if DISPATCH_TRANSPORT == "fake":
+        return FakeMailTransport()
+
+    from .state import get_token_refresher
+
+    creds = get_token_refresher().creds_for(session_id)
+    if not creds:
+        raise RuntimeError("Not connected to Gmail")
+    return GmailTransport(creds)
+
+
+_running: set[str] = set()
+_running_lock = threading.Lock()
+
+
+def is_running(user_key: str) -> bool:
+    with _running_lock:
+        return user_key in _running
+
+
+def dispatch_queued(user_key: str, session_id: str, batch_size: int = DISPATCH_BATCH_SIZE) -> dict:
+    """Send everything queued for one user through the mailbox of `session_id`.
+
+    A no-op if a dispatcher already runs for them.
+    """
+    with _running_lock:
+        if user_key in _running:
+            return {"started": False}
+        _running.add(user_key)
+
+    sent = failed = unknown = 0
+    try:
+        transport = make_transport(session_id)
+        quota = budget_for(session_id)
+        pace = send_budget_for(session_id)
+        try:
+            while True:
+                rows = store.claim_outbound(user_key, batch_size)
+                if not rows:
+                    break
+                for row, msg in zip(rows, build_messages(rows, transport.sender)):
+                    pace.charge("messages.send")
+                    quota.charge("messages.send")
+                    try:
+                        provider_id = transport.send(msg)
+                    except TransientSendError as e:
+                        # back in the queue for the next batch, up to MAX_ATTEMPTS
+                        status = "queued" if row["attempts"] < MAX_ATTEMPTS else "failed"
+                        store.finish_outbound(row["id"], status, error=str(e)[:500])
+                        failed += status == "failed"
+                    except SendOutcomeUnknown as e:
+                        # maybe delivered: park it like an interrupted send
+                        store.finish_outbound(
+                            row["id"], "unknown", error=f"Outcome unknown ({str(e)[:300]}); check the Sent folder"
+                        )
+                        unknown += 1
+                    except Exception as e:
+                        store.finish_outbound(row["id"], "failed", error=str(e)[:500])
+                        failed += 1
+                    else:
+                        store.finish_outbound(row["id"], "sent", provider_id=provider_id)
+                        sent += 1
+        finally:
+            transport.close()
+    finally:
+        with _running_lock:
+            _running.discard(user_key)
+    return {"started": True, "sent": sent, "failed": failed, "unknown": unknown}
+
+
+def recover_interrupted(user_key: str) -> int:
+    """Park letters a crashed dispatcher left mid-send (only when none is running)."""
+    with _running_lock:
+        if user_key in _running:
+            return 0
+        return store.recover_outbound(user_key)
@@ -1,31 +1,37 @@
 import os
-from datetime import timedelta
 from dotenv import load_dotenv
 
-load_dotenv()
+# Load .env once for the whole process; modules below only read os.environ.
+load_dotenv(override=True)
 
 from fastapi import FastAPI, HTTPException, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as grequests
-
-from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from . import admission, profiling
+from .responses import CompressionMiddleware, FastJSONResponse
+from .sessions import SESSION_COOKIE, SESSION_MAX_AGE_SECONDS, read_session_cookie, serializer, user_key
 from .routes.gmail import router as gmail_router
 
 from .routes.privacy import router as privacy_router
 from .routes.letter import router as letter_router
 from .routes.gmail_scan import router as gmail_scan_router
+from .routes.accounts import router as accounts_router
+from .routes.admin import router as admin_router
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-SESSION_SECRET = os.getenv("SESSION_SECRET", "dev-secret")
 
 if not GOOGLE_CLIENT_ID:
     raise RuntimeError("Missing GOOGLE_CLIENT_ID in .env")
 
-app = FastAPI(title="Hackathon API")
+app = FastAPI(title="Hackathon API", default_response_class=FastJSONResponse)
+
+# Innermost: profiles only the work of admitted requests
+app.add_middleware(profiling.ProfilingMiddleware)
+# Added before CORS so CORS stays outermost and 503s still carry CORS headers
+app.add_middleware(admission.AdmissionMiddleware, key_func=lambda request: admission_key(request))
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,11 +41,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-serializer = URLSafeTimedSerializer(SESSION_SECRET)
-SESSION_COOKIE = "session"
-SESSION_MAX_AGE_SECONDS = int(timedelta(days=7).total_seconds())
-
-
 class GoogleLoginPayload(BaseModel):
     id_token: str
 
@@ -65,13 +66,10 @@ def create_session_cookie(payload: dict) -> str:
     return serializer.dumps(session_data)
 
 
-def read_session_cookie(cookie_value: str) -> dict:
-    try:
-        return serializer.loads(cookie_value, max_age=SESSION_MAX_AGE_SECONDS)
-    except SignatureExpired:
-        raise HTTPException(status_code=401, detail="Session expired")
-    except BadSignature:
-        raise HTTPException(status_code=401, detail="Invalid session")
+def admission_key(request: Request) -> str:
+    # Per-user key for admission control; a fresh random cookie per request
+    # must not count as a fresh user, so unvalidated clients share their IP's key
+    return user_key(request) or f"ip:{request.client.host if request.client else 'unknown'}"
 
 
 @app.get("/health")
@@ -81,6 +79,10 @@ def health():
 
 @app.post("/auth/google")
 def auth_google(body: GoogleLoginPayload, response: Response):
+    # Imported lazily: google.auth's requests transport is only needed at login.
+    from google.oauth2 import id_token
+    from google.auth.transport import requests as grequests
+
     try:
         payload = id_token.verify_oauth2_token(
             body.id_token,
@@ -130,4 +132,6 @@ app.include_router(gmail_router)
 app.include_router(privacy_router)
 app.include_router(letter_router)
 app.include_router(gmail_scan_router)
+app.include_router(accounts_router)
+app.include_router(admin_router)
 
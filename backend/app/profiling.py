@@ -0,0 +1,249 @@
+"""
+On-demand request profiling: per-stage timings and sampled collapsed stacks.
+"""
+import contextvars
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_PATHS = ("/gmail/scan", "/letter/generate")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+MAX_STACK_DEPTH = 64
+
+_active: contextvars.ContextVar["Profile | None"] = contextvars.ContextVar("profile", default=None)
+
+
+def _signer() -> URLSafeTimedSerializer | None:
+    secret = os.getenv("ADMIN_TOKEN")
+    return URLSafeTimedSerializer(secret, salt="profile") if secret else None
+
+
+def make_token() -> str:
+    signer = _signer()
+    if signer is None:
+        raise RuntimeError("ADMIN_TOKEN is not configured")
+    return signer.dumps("profile")
+
+
+def _token_ok(token: str) -> bool:
+    signer = _signer()
+    if signer is None:
+        return False
+    try:
+        return signer.loads(token, max_age=PROFILE_TOKEN_MAX_AGE) == "profile"
+    except BadSignature:  # includes SignatureExpired
+        return False
+
+
+class Profile:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = f"{int(time.time())}-{next(_ids)}"
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started = time.perf_counter()
+        self.wall_ms = 0.0
+        self.status: int | None = None
+        self.samples: Counter[str] = Counter()
+        # stage name -> [calls, wall ms, cpu ms]
+        self.stages: dict[str, list[float]] = {}
+        # thread id -> number of open stages in that thread
+        self.threads: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _enter(self, tid: int) -> None:
+        with self._lock:
+            self.threads[tid] = self.threads.get(tid, 0) + 1
+
+    def _exit(self, tid: int, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            n = self.threads[tid] - 1
+            if n:
+                self.threads[tid] = n
+            else:
+                del self.threads[tid]
+            st = self.stages.get(name)
+            if st is None:
+                st = self.stages[name] = [0, 0.0, 0.0]
+            st[0] += 1
+            st[1] += wall * 1000
+            st[2] += cpu * 1000
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {"calls": int(c), "wall_ms": round(w, 1), "cpu_ms": round(cpu, 1)}
+                for name, (c, w, cpu) in sorted(self.stages.items(), key=lambda kv: -kv[1][1])
+            }
+            samples = sum(self.samples.values())
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_ms, 1),
+            "samples": samples,
+            "stages": stages,
+        }
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+
+_ids = itertools.count(1)
+
+
+class stage:
+    """`with stage("gmail.list"):` - time a block for the active profile, if any."""
+
+    __slots__ = ("name", "profile", "tid", "wall", "cpu")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _active.get()
+        if self.profile is not None:
+            self.tid = threading.get_ident()
+            self.profile._enter(self.tid)
+            self.wall = time.perf_counter()
+            self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile._exit(
+                self.tid,
+                self.name,
+                time.perf_counter() - self.wall,
+                time.thread_time() - self.cpu,
+            )
+        return False
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Run `fn` (e.g. in a pool thread) inside the caller's profile, if one is active."""
+    if _active.get() is None:
+        return fn
+    ctx = contextvars.copy_context()
+    # a Context can only be entered by one thread at a time: copy per call
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+# ---- sampler -------------------------------------------------------------
+
+_running: set[Profile] = set()
+_captures: deque[Profile] = deque(maxlen=PROFILE_KEEP)
+_lock = threading.Lock()
+_wake = threading.Condition(_lock)
+_sampler: threading.Thread | None = None
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sample_loop() -> None:
+    interval = PROFILE_INTERVAL_MS / 1000
+    while True:
+        with _lock:
+            while not _running:
+                _wake.wait()
+            profiles = list(_running)
+        frames = sys._current_frames()
+        for prof in profiles:
+            with prof._lock:
+                tids = list(prof.threads)
+            stacks = [_collapse(frames[t]) for t in tids if t in frames]
+            with prof._lock:
+                prof.samples.update(stacks)
+        del frames
+        time.sleep(interval)
+
+
+def start(method: str, path: str, reason: str) -> tuple[Profile, contextvars.Token]:
+    global _sampler
+    prof = Profile(method, path, reason)
+    with _lock:
+        _running.add(prof)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="profile-sampler", daemon=True)
+            _sampler.start()
+        _wake.notify()
+    return prof, _active.set(prof)
+
+
+def finish(prof: Profile, token: contextvars.Token) -> None:
+    _active.reset(token)
+    prof.wall_ms = (time.perf_counter() - prof.started) * 1000
+    with _lock:
+        _running.discard(prof)
+        _captures.append(prof)
+
+
+def captures() -> list[dict]:
+    with _lock:
+        profiles = list(_captures)
+    return [p.summary() for p in reversed(profiles)]
+
+
+def get_capture(profile_id: str) -> Profile | None:
+    with _lock:
+        return next((p for p in _captures if p.id == profile_id), None)
+
+
+def _reason(scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return "header" if _token_ok(value.decode("latin-1")) else None
+    if PROFILE_SAMPLE_RATE and scope["path"].startswith(PROFILE_PATHS) and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """Tags profiled responses with X-Profile-Id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        reason = _reason(scope)
+        if reason is None:
+            return await self.app(scope, receive, send)
+
+        prof, token = start(scope["method"], scope["path"], reason)
+
+        async def send_tagged(message):
+            if message["type"] == "http.response.start":
+                prof.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", prof.id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tagged)
+        finally:
+            finish(prof, token)
@@ -0,0 +1,72 @@
+"""
+Per-user Gmail API quota budgets.
+"""
+import os
+import threading
+import time
+
+# https://developers.google.com/gmail/api/reference/quota
+UNITS = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "messages.send": 100,
+}
+
+USER_UNITS_PER_SECOND = float(os.getenv("GMAIL_USER_UNITS_PER_SECOND", "250"))
+# Outgoing mail is paced far below the API quota: Gmail throttles (and flags)
+# accounts that send in bursts, and caps messages per day
+SENDS_PER_MINUTE = float(os.getenv("GMAIL_SENDS_PER_MINUTE", "30"))
+SEND_BURST = 5
+
+
+class QuotaBudget:
+    """Token bucket refilled at `rate` units/second, holding at most `burst` units."""
+
+    def __init__(self, rate: float = USER_UNITS_PER_SECOND, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def charge(self, method: str, count: int = 1) -> None:
+        """Block until `count` calls of `method` fit in the budget, then spend them."""
+        units = UNITS.get(method, 5) * count
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= units:
+                    self._tokens -= units
+                    return
+                wait = (units - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_budgets: dict[str, QuotaBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def budget_for(session_id: str) -> QuotaBudget:
+    """Shared budget for one mailbox, so concurrent jobs on it split the quota."""
+    with _budgets_lock:
+        budget = _budgets.get(session_id)
+        if budget is None:
+            budget = _budgets[session_id] = QuotaBudget()
+        return budget
+
+
+_send_budgets: dict[str, QuotaBudget] = {}
+
+
+def send_budget_for(session_id: str) -> QuotaBudget:
+    """Per-mailbox send pacing, charged with "messages.send" on top of `budget_for`."""
+    units = UNITS["messages.send"]
+    with _budgets_lock:
+        budget = _send_budgets.get(session_id)
+        if budget is None:
+            budget = _send_budgets[session_id] = QuotaBudget(
+                rate=SENDS_PER_MINUTE * units / 60, burst=SEND_BURST * units
+            )
+        return budget
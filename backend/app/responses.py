@@ -0,0 +1,129 @@
+"""
+Response encoding (orjson / MessagePack) and compression for the list endpoints.
+"""
+import gzip
+import json
+import os
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is correct, just slower
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: clients then get JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional: clients then get gzip
+    brotli = None
+
+MSGPACK = "application/msgpack"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", MSGPACK, "text/")
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def response_format(request: Request) -> str:
+    """Negotiated body format: msgpack if the client accepts it and we can produce it."""
+    if msgpack is not None and MSGPACK in request.headers.get("accept", ""):
+        return "msgpack"
+    return "json"
+
+
+def encoded(request: Request, content: Any, headers: dict[str, str] | None = None) -> Response:
+    if response_format(request) == "msgpack":
+        response = Response(msgpack.packb(content, use_bin_type=True), media_type=MSGPACK, headers=headers)
+    else:
+        response = FastJSONResponse(content, headers=headers)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+def _pick_encoding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(coding: str, body: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """gzip / br for single-message bodies of at least `minimum_size` bytes; streams pass through."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until we have seen the first body chunk
+                return
+            if message["type"] != "http.response.body" or start is None:
+                return await send(message)
+
+            held, start = {**start, "headers": list(start.get("headers", []))}, None
+            headers = MutableHeaders(raw=held["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(held)
+                return await send(message)
+
+            data = compress(coding, body)
+            headers["Content-Encoding"] = coding
+            headers["Content-Length"] = str(len(data))
+            headers.add_vary_header("Accept-Encoding")
+            await send(held)
+            await send({"type": "http.response.body", "body": data})
+
+        await self.app(scope, receive, send_compressed)
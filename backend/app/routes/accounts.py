@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from ..sessions import user_key
+from ..state import get_privacy_prefetcher
+from .letter import estimate_contact_email
+from .privacy import lookup_delete_link, normalize_domain
+
+router = APIRouter(prefix="/accounts", tags=["accounts"])
+
+# One budget for all enrichment work in the process, shared across requests
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "16"))
+ENRICH_DOMAIN_TIMEOUT_SECONDS = float(os.getenv("ENRICH_DOMAIN_TIMEOUT_SECONDS", "45"))
+MAX_ENRICH_DOMAINS = 200
+# lookups one request may have on the pool at once, so a long list doesn't
+# queue ahead of every other request's domains
+ENRICH_PER_REQUEST = ENRICH_CONCURRENCY
+POLL_SECONDS = 1.0
+
+_pool = ThreadPoolExecutor(max_workers=ENRICH_CONCURRENCY, thread_name_prefix="enrich")
+
+
+class EnrichBody(BaseModel):
+    domains: list[str] = Field(..., max_length=MAX_ENRICH_DOMAINS)
+
+
+def _privacy_part(found: dict) -> dict:
+    policy_url = found.get("privacy_policy_url")
+    email = found.get("privacy_contact_email")
+    estimated = False
+    if policy_url and not email:
+        email = estimate_contact_email(found["base_url"])
+        estimated = True
+    return {
+        "privacy_policy_url": policy_url,
+        "privacy_contact_email": email,
+        "privacy_contact_email_estimated": estimated,
+        # /letter/generate only needs a policy URL; the email can be estimated
+        "letter_ready": policy_url is not None,
+    }
+
+
+def _error(e: BaseException) -> str:
+    return str(e)[:300] or type(e).__name__
+
+
+def _enrich_stream(domains: list[str]):
+    prefetcher = get_privacy_prefetcher()
+    records: dict[str, dict] = {}
+    parts_left: dict[str, set[str]] = {}
+    started: dict[str, float] = {}
+    jobs: deque[tuple[str, str]] = deque()
+
+    for domain in domains:
+        records[domain] = {
+            "domain": domain,
+            "privacy_policy_url": None,
+            "privacy_contact_email": None,
+            "privacy_contact_email_estimated": False,
+            "letter_ready": False,
+            "delete_link": None,
+            "errors": {},
+        }
+        parts_left[domain] = {"privacy", "delete_link"}
+        jobs.extend(((domain, "privacy"), (domain, "delete_link")))
+
+    def run(domain: str, part: str):
+        # a domain's timeout counts from when its work starts, not from time
+        # spent queued behind other domains on the shared pool
+        started.setdefault(domain, time.monotonic())
+        if part == "privacy":
+            return prefetcher.lookup(f"https://{domain}")
+        # crawl only: the LLM fallback is for explicit per-domain lookups
+        return lookup_delete_link(domain, llm_fallback=False)
+
+    def finish(domain: str) -> str:
+        parts_left.pop(domain, None)
+        return json.dumps(records[domain]) + "\n"
+
+    owner: dict[Future, tuple[str, str]] = {}
+    pending: set[Future] = set()
+    while jobs or pending:
+        while jobs and len(pending) < ENRICH_PER_REQUEST:
+            domain, part = jobs.popleft()
+            if domain in parts_left:
+                fut = _pool.submit(run, domain, part)
+                owner[fut] = (domain, part)
+                pending.add(fut)
+
+        now = time.monotonic()
+        deadlines = [started[d] + ENRICH_DOMAIN_TIMEOUT_SECONDS for d in parts_left if d in started]
+        # nothing started yet: poll, since a task starting doesn't wake us
+        timeout = max(0.0, min(deadlines, default=now + POLL_SECONDS) - now)
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for fut in done:
+            domain, part = owner.pop(fut)
+            if domain not in parts_left:
+                continue  # already emitted as timed out
+            rec = records[domain]
+            try:
+                result = fut.result()
+            except Exception as e:
+                rec["errors"][part] = _error(e)
+            else:
+                if part == "privacy":
+                    rec.update(_privacy_part(result))
+                else:
+                    rec["delete_link"] = result
+            parts_left[domain].discard(part)
+            if not parts_left[domain]:
+                yield finish(domain)
+
+        now = time.monotonic()
+        for domain in [d for d in parts_left if d in started and started[d] + ENRICH_DOMAIN_TIMEOUT_SECONDS <= now]:
+            # running lookups can't be stopped; drop the ones still queued on
+            # the shared pool and stop waiting for the rest
+            for f in [f for f in pending if owner[f][0] == domain]:
+                f.cancel()
+                pending.discard(f)
+                owner.pop(f)
+            for part in parts_left[domain]:
+                records[domain]["errors"][part] = "timeout"
+            yield finish(domain)
+
+
+@router.post("/enrich")
+def enrich_accounts(body: EnrichBody, request: Request):
+    """Policy URL, privacy contact, delete link and letter readiness per domain.
+
+    Streams one NDJSON line per domain as soon as both lookups for it finish
+    (or it hits the per-domain timeout). Delete links come from the crawl
+    only; unconfident ones are left for /privacy/find_delete_link.
+    """
+    if not user_key(request):
+        raise HTTPException(401, "Not connected to Gmail")
+
+    domains = list(dict.fromkeys(normalize_domain(d) for d in body.domains if d.strip()))
+    return StreamingResponse(_enrich_stream(domains), media_type="application/x-ndjson")
@@ -0,0 +1,105 @@
+import os
+import secrets
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from .. import profiling, store
+from ..state import get_llm_gateway, get_token_refresher
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(request: Request) -> None:
+    # Internal endpoints are disabled entirely unless ADMIN_TOKEN is configured
+    if not ADMIN_TOKEN:
+        raise HTTPException(404, "Not found")
+    token = request.headers.get("x-admin-token", "")
+    if not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(403, "Forbidden")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+class BatchScanBody(BaseModel):
+    session_ids: list[str] | None = None
+    run_id: str | None = None
+    years: int = 1
+    limit: int = 300
+    workers: int | None = None
+
+
+@router.post("/scan/batch")
+def start_batch_scan(body: BatchScanBody, background: BackgroundTasks):
+    from ..batch_scan import DEFAULT_WORKERS, list_sessions, run_batch
+
+    sessions = body.session_ids if body.session_ids is not None else list_sessions()
+    run_id = body.run_id or f"batch-{secrets.token_hex(6)}"
+    background.add_task(
+        run_batch,
+        sessions,
+        run_id=run_id,
+        years=body.years,
+        limit=body.limit,
+        workers=body.workers or DEFAULT_WORKERS,
+    )
+    return {"ok": True, "run_id": run_id, "sessions": len(sessions)}
+
+
+@router.get("/scan/batch/{run_id}")
+def batch_scan_status(run_id: str):
+    return store.run_status(run_id)
+
+
+@router.get("/llm/usage")
+def llm_usage():
+    return get_llm_gateway().usage()
+
+
+@router.get("/crawler/breakers")
+def crawler_breakers():
+    from ..ai.transport import breaker_states
+
+    return breaker_states()
+
+
+@router.get("/admission")
+def admission_metrics():
+    from ..admission import snapshot
+
+    return snapshot()
+
+
+@router.get("/tokens")
+def token_refresh_status():
+    return get_token_refresher().snapshot()
+
+
+@router.post("/profiles/token")
+def profile_token():
+    # send as `X-Profile: <token>` to profile that request (valid for an hour)
+    return {"header": "X-Profile", "token": profiling.make_token(), "max_age": profiling.PROFILE_TOKEN_MAX_AGE}
+
+
+@router.get("/profiles")
+def list_profiles():
+    return profiling.captures()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    prof = profiling.get_capture(profile_id)
+    if prof is None:
+        raise HTTPException(404, "Unknown profile")
+    return prof.summary()
+
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def get_profile_stacks(profile_id: str):
+    """Collapsed stacks, one `frame;frame;frame count` per line (flamegraph.pl, speedscope)."""
+    prof = profiling.get_capture(profile_id)
+    if prof is None:
+        raise HTTPException(404, "Unknown profile")
+    return prof.collapsed()
@@ -2,16 +2,20 @@ import os
 import secrets
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import RedirectResponse
-from google_auth_oauthlib.flow import Flow
-from typing import Dict
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from typing import TYPE_CHECKING
 import json
 from pathlib import Path
-import base64
-from email.utils import parsedate_to_datetime
 from fastapi import Response
 
+from ..gmail_fetch import get_headers, list_message_ids
+from .. import store
+from ..letter_dispatch import DISPATCH_ENABLED, GMAIL_SEND_SCOPE
+from ..sessions import login_key
+from ..state import get_token_refresher, gmail_service
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import Flow
 
 
 router = APIRouter(prefix="/gmail", tags=["gmail"])
@@ -27,35 +31,46 @@ SCOPES = [
     "https://www.googleapis.com/auth/userinfo.profile",
     "https://www.googleapis.com/auth/gmail.readonly",
 ]
+# Only ask for send permission when letters can actually be sent from here
+if DISPATCH_ENABLED:
+    SCOPES.append(GMAIL_SEND_SCOPE)
 
 
 TOK_DIR = Path(".gmail_tokens")
-TOK_DIR.mkdir(exist_ok=True)
 
 
-def _header(headers, name: str) -> str | None:
-    for h in headers or []:
-        if h.get("name", "").lower() == name.lower():
-            return h.get("value")
-    return None
+def save_creds(session_id: str, creds: "Credentials") -> None:
+    TOK_DIR.mkdir(exist_ok=True)
+    (TOK_DIR / f"{session_id}.json").write_text(creds.to_json())
 
 
-def save_creds(session_id: str, creds: Credentials) -> None:
-    (TOK_DIR / f"{session_id}.json").write_text(creds.to_json())
+def delete_creds(session_id: str) -> None:
+    (TOK_DIR / f"{session_id}.json").unlink(missing_ok=True)
+
+
+def has_creds(session_id: str) -> bool:
+    """Whether tokens are stored for `session_id` (no parsing, no refresh)."""
+    return "/" not in session_id and (TOK_DIR / f"{session_id}.json").is_file()
 
 
-def load_creds(session_id: str) -> Credentials | None:
+def load_creds(session_id: str) -> "Credentials | None":
     p = TOK_DIR / f"{session_id}.json"
     if not p.exists():
         return None
+    from google.oauth2.credentials import Credentials
+
     data = json.loads(p.read_text())
-    return Credentials.from_authorized_user_info(data, SCOPES)
+    # the scopes this token was granted, not today's SCOPES: refreshing with a
+    # scope the user never consented to fails
+    return Credentials.from_authorized_user_info(data)
     
 
-def make_flow(redirect_uri: str) -> Flow:
+def make_flow(redirect_uri: str) -> "Flow":
     if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
         raise RuntimeError("Missing GOOGLE_CLIENT_ID or GOOGLE_CLIENT_SECRET")
 
+    from google_auth_oauthlib.flow import Flow
+
     client_config = {
         "web": {
             "client_id": GOOGLE_CLIENT_ID,
@@ -130,12 +145,17 @@ def gmail_callback(request: Request):
         # If you get 500s, it’s usually here: redirect mismatch, bad secret, etc.
         raise HTTPException(status_code=500, detail=f"Token exchange failed: {e}")
 
-    creds: Credentials = flow.credentials
+    creds = flow.credentials
 
     # 4) Create a session id + store tokens in memory
     session_id = request.cookies.get("gmail_session_id") or secrets.token_urlsafe(24)
     save_creds(session_id, creds)
-
+    get_token_refresher().track(session_id, creds)
+    # file results under the login this mailbox was connected from, so a later
+    # reconnect with a new session id still finds them
+    owner = login_key(request)
+    if owner:
+        store.link_session(session_id, owner)
 
     # 5) Redirect to frontend, set session cookie
     resp = RedirectResponse(f"{FRONTEND_URL}/?gmail=connected", status_code=302)
@@ -158,11 +178,11 @@ def list_messages(request: Request):
     if not session_id:
         raise HTTPException(401, "Missing session cookie")
 
-    creds = load_creds(session_id)
+    creds = get_token_refresher().creds_for(session_id)
     if not creds:
         raise HTTPException(401, "Not connected to Gmail")
 
-    service = build("gmail", "v1", credentials=creds)
+    service = gmail_service(creds)
     return service.users().messages().list(userId="me", maxResults=5).execute()
 
 
@@ -172,7 +192,7 @@ def gmail_status(request: Request):
     if not session_id:
         return {"connected": False}
 
-    creds = load_creds(session_id)
+    creds = get_token_refresher().creds_for(session_id)
     if not creds:
         return {"connected": False}
 
@@ -185,9 +205,8 @@ def gmail_disconnect(request: Request):
     
     session_id = request.cookies.get("gmail_session_id")
     if session_id:
-        p = TOK_DIR / f"{session_id}.json"
-        if p.exists():
-            p.unlink()
+        get_token_refresher().forget(session_id)
+        delete_creds(session_id)
     
     resp = Response(content='{"ok": true}', media_type="application/json")
     resp.delete_cookie("gmail_session_id", path="/")
@@ -200,32 +219,23 @@ def debug_print_emails(request: Request):
     if not session_id:
         raise HTTPException(401, "Missing session cookie")
 
-    creds = load_creds(session_id)
+    creds = get_token_refresher().creds_for(session_id)
     if not creds:
         raise HTTPException(401, "Not connected to Gmail")
 
-    service = build("gmail", "v1", credentials=creds)
+    service = gmail_service(creds)
 
     # Get last 10 messages
-    listing = service.users().messages().list(userId="me", maxResults=10).execute()
-    msgs = listing.get("messages", [])
-
     out = []
-    for m in msgs:
-        msg = service.users().messages().get(
-            userId="me",
-            id=m["id"],
-            format="metadata",
-            metadataHeaders=["From", "Subject", "Date"],
-        ).execute()
-
-        headers = msg.get("payload", {}).get("headers", [])
-        subj = _header(headers, "Subject") or "(no subject)"
-        frm = _header(headers, "From") or "(no from)"
-        date = _header(headers, "Date") or "(no date)"
-        snippet = msg.get("snippet", "")
-
-        out.append({"from": frm, "subject": subj, "date": date, "snippet": snippet})
+    for msg_id in list_message_ids(service, max_results=10):
+        msg = get_headers(service, msg_id, with_snippet=True)
+        received = msg.received_at
+        out.append({
+            "from": msg.from_ or "(no from)",
+            "subject": msg.subject or "(no subject)",
+            "date": received.isoformat() if received else "(no date)",
+            "snippet": msg.snippet,
+        })
 
     # Print to server logs (quick proof)
     print("\n=== Gmail debug (latest 10) ===")
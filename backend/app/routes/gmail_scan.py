@@ -1,47 +1,55 @@
 import re
-from datetime import timezone, datetime
-from email.utils import parsedate_to_datetime
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from fastapi import APIRouter, Request, HTTPException
-from googleapiclient.discovery import build
-
-# import your existing token loader from gmail.py
-from .gmail import load_creds
+from pydantic import BaseModel
+from .. import store
+from ..gmail_fetch import MessageHeaders, get_headers_many, list_message_ids_sharded
+from ..http_cache import decode_cursor, encode_cursor, make_etag, not_modified, set_cache_headers
+from ..profiling import stage
+from ..quota import QuotaBudget, budget_for
+from ..responses import encoded, response_format
+from ..sessions import user_key
+from ..ai.prefetch import rank_for_prefetch
+from ..state import get_privacy_prefetcher, get_token_refresher, gmail_service
 
 router = APIRouter(prefix="/gmail", tags=["gmail"])
 
-SIGNUP_QUERY = (
-    'newer_than:{years}y '
+# The time window is added per shard as after:/before: clauses
+SIGNUP_TERMS = (
     '(subject:(welcome OR verify OR verification OR confirm OR activate OR "account created" OR "confirm your email") '
     'OR "verify your email" OR "confirm your email" OR "activation link") '
     '-category:promotions'
 )
 
 
-def hdr(headers: list[dict], name: str) -> str:
-    for h in headers or []:
-        if h.get("name", "").lower() == name.lower():
-            return h.get("value", "") or ""
-    return ""
+ANGLE_ADDR_RE = re.compile(r"<([^>]+)>")
 
+# Most messages one interactive /scan may read; batch scans set their own bound
+MAX_SCAN_MESSAGES = 500
 
-def parse_email_date(date_str: str) -> Optional[datetime]:
-    if not date_str:
-        return None
-    try:
-        dt = parsedate_to_datetime(date_str)
-        if dt is None:
-            return None
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
-    except Exception:
-        return None
+
+# Response shapes, for the OpenAPI docs only: routes return pre-encoded responses
+class ScanRecord(BaseModel):
+    domain: str
+    displayName: str
+    confidence: str
+    evidence: list[str]
+    lastSeen: Optional[str] = None
+
+
+class StoredAccount(ScanRecord):
+    updatedAt: float
+
+
+class AccountsPage(BaseModel):
+    accounts: list[StoredAccount]
+    next_cursor: Optional[str] = None
+    watermark: Optional[float] = None
 
 
 def extract_domain_from_from_header(from_value: str) -> Optional[str]:
-    m = re.search(r"<([^>]+)>", from_value or "")
+    m = ANGLE_ADDR_RE.search(from_value or "")
     email = (m.group(1) if m else (from_value or "")).strip()
     if "@" not in email:
         return None
@@ -56,66 +64,115 @@ def normalize_domain(domain: str) -> str:
     return domain
 
 
-@router.get("/scan")
-def scan_accounts(request: Request, years: int = 1, limit: int = 300):
-    session_id = request.cookies.get("gmail_session_id")
-    if not session_id:
-        raise HTTPException(401, "Missing session cookie")
-
-    creds = load_creds(session_id)
-    if not creds:
-        raise HTTPException(401, "Not connected to Gmail")
-
-    service = build("gmail", "v1", credentials=creds)
-    q = SIGNUP_QUERY.format(years=years)
+def scan_mailbox(
+    make_service: Callable[[], Any],
+    years: int = 1,
+    limit: int = 300,
+    quota: Optional[QuotaBudget] = None,
+    num_retries: int = 0,
+) -> list[dict]:
+    """Scan one mailbox for signup emails; returns one record per domain (oldest first).
 
-    listing = service.users().messages().list(
-        userId="me",
-        q=q,
-        maxResults=min(limit, 500),
-    ).execute()
+    `make_service` builds a Gmail client; it is called once per worker thread.
+    Usable outside a request (batch scans); pass `quota` to stay within the
+    user's Gmail budget and `num_retries` to back off on 429/5xx.
+    """
+    ids = list_message_ids_sharded(make_service, SIGNUP_TERMS, years=years, limit=limit, quota=quota, num_retries=num_retries)
+    messages = get_headers_many(make_service, ids, quota=quota, num_retries=num_retries)
+    with stage("scan.extract_domains"):
+        return _records_by_domain(messages)
 
-    msgs = listing.get("messages", [])
 
+def _records_by_domain(messages: list[MessageHeaders]) -> list[dict]:
     # domain -> best record (oldest date)
     best_by_domain: dict[str, dict] = {}
 
-    for m in msgs:
-        msg = service.users().messages().get(
-            userId="me",
-            id=m["id"],
-            format="metadata",
-            metadataHeaders=["From", "Subject", "Date"],
-        ).execute()
-
-        headers = msg.get("payload", {}).get("headers", [])
-        frm = hdr(headers, "From")
-        date_raw = hdr(headers, "Date")
+    for msg in messages:
+        if not msg.internal_date:
+            continue
 
-        domain = extract_domain_from_from_header(frm)
+        domain = extract_domain_from_from_header(msg.from_)
         if not domain:
             continue
         domain = normalize_domain(domain)
 
-        dt = parse_email_date(date_raw)
-        if not dt:
-            continue
-
         existing = best_by_domain.get(domain)
-        if (existing is None) or (dt < existing["_dt"]):
+        if (existing is None) or (msg.internal_date < existing["_ts"]):
             best_by_domain[domain] = {
                 "domain": domain,
                 "displayName": domain.split(".")[0].capitalize(),
                 "confidence": "high",
                 "evidence": ["welcome"],
-                "lastSeen": dt.date().isoformat(),  # yyyy-mm-dd
-                "_dt": dt,
+                "lastSeen": msg.received_at.date().isoformat(),  # yyyy-mm-dd
+                "_ts": msg.internal_date,
             }
 
     results = []
     for v in best_by_domain.values():
-        v.pop("_dt", None)
+        v.pop("_ts", None)
         results.append(v)
 
     results.sort(key=lambda x: x.get("lastSeen") or "9999-12-31")
     return results
+
+
+@router.get("/scan", response_model=list[ScanRecord])
+def scan_accounts(request: Request, years: int = 1, limit: int = 300):
+    session_id = request.cookies.get("gmail_session_id")
+    if not session_id:
+        raise HTTPException(401, "Missing session cookie")
+
+    creds = get_token_refresher().creds_for(session_id)
+    if not creds:
+        raise HTTPException(401, "Not connected to Gmail")
+
+    limit = max(1, min(limit, MAX_SCAN_MESSAGES))
+    with stage("scan.mailbox"):
+        results = scan_mailbox(lambda: gmail_service(creds), years=years, limit=limit, quota=budget_for(session_id))
+    with stage("scan.store"):
+        store.save_scan_results(user_key(request) or f"gmail:{session_id}", results)
+    # warm privacy discovery for the domains the user is most likely to click next
+    get_privacy_prefetcher().warm(rank_for_prefetch(results))
+    return encoded(request, results)
+
+
+@router.get("/accounts", response_model=AccountsPage)
+def list_accounts(
+    request: Request,
+    since: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 200,
+):
+    """Stored scan results, oldest change first; pass `since=watermark` for a delta."""
+    key = user_key(request)
+    if not key:
+        raise HTTPException(401, "Not connected to Gmail")
+
+    limit = max(1, min(limit, 1000))
+    after = None
+    if cursor:
+        try:
+            updated_at, domain = decode_cursor(cursor)
+            after = (float(updated_at), str(domain))
+        except (ValueError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+
+    etag = make_etag("accounts", store.scan_results_version(key), since, cursor, limit, response_format(request))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    rows = store.list_scan_results(key, since=since, after=after, limit=limit)
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["updatedAt"], last["domain"])
+
+    response = encoded(request, {
+        "accounts": rows,
+        "next_cursor": next_cursor,
+        # pass back as `since` to fetch only what changed after this page
+        "watermark": rows[-1]["updatedAt"] if rows else since,
+    })
+    set_cache_headers(response, etag)
+    return response
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from pydantic import BaseModel, Field
 from urllib.parse import urlparse
 
-from ..ai.privacy_finder import find_privacy_policy_and_email
 from ..ai.letter_generator import generate_letter_xml, parse_result_xml
+from ..ai.llm import LLMUnavailable
+from .. import letter_dispatch, store
+from ..http_cache import decode_cursor, encode_cursor, make_etag, not_modified, set_cache_headers
+from ..profiling import stage
+from ..responses import encoded, response_format
+from ..sessions import user_key
+from ..state import get_privacy_prefetcher, get_token_refresher
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 router = APIRouter(prefix="/letter", tags=["letter"])
 
 
+MAX_DISPATCH = 500
+
+
 class GenerateLetterRequest(BaseModel):
     company_name: str = Field(..., min_length=2)
     company_website_url: str = Field(..., min_length=4)
@@ -16,10 +30,23 @@ class GenerateLetterRequest(BaseModel):
     user_email: str = ""
 
 
+def estimate_contact_email(base_url: str) -> str:
+    """Best-guess privacy inbox when the site doesn't publish one."""
+    domain = urlparse(base_url).netloc.replace("www.", "")
+    common_emails = [
+        f"privacy@{domain}",
+        f"dpo@{domain}",
+        f"dataprotection@{domain}",
+        f"legal@{domain}",
+    ]
+    return common_emails[0]
+
+
 @router.post("/generate")
-def generate_letter_route(body: GenerateLetterRequest):
-    # Step A: deterministic lookup (no guessing)
-    found = find_privacy_policy_and_email(body.company_website_url)
+def generate_letter_route(body: GenerateLetterRequest, request: Request):
+    # Step A: deterministic lookup (no guessing); usually already warmed by the scan
+    with stage("letter.privacy_lookup"):
+        found = get_privacy_prefetcher().lookup(body.company_website_url)
 
     policy_url = found.get("privacy_policy_url")
     contact_email = found.get("privacy_contact_email")
@@ -37,27 +64,22 @@ def generate_letter_route(body: GenerateLetterRequest):
 
     # If we have policy URL but no email, try common email patterns
     if not contact_email:
-        parsed = urlparse(found["base_url"])
-        domain = parsed.netloc.replace("www.", "")
-        common_emails = [
-            f"privacy@{domain}",
-            f"dpo@{domain}",
-            f"dataprotection@{domain}",
-            f"legal@{domain}",
-        ]
-        contact_email = common_emails[0]
+        contact_email = estimate_contact_email(found["base_url"])
         found["privacy_contact_email_estimated"] = True
 
     # Step B: LLM writes letter using provided facts
-    raw_xml = generate_letter_xml(
-        company_name=body.company_name,
-        company_website_url=found["base_url"],
-        privacy_policy_url=policy_url,
-        privacy_contact_email=contact_email,
-        product_or_service_used=body.product_or_service_used,
-        user_full_name=body.user_full_name,
-        user_email=body.user_email,
-    )
+    try:
+        raw_xml = generate_letter_xml(
+            company_name=body.company_name,
+            company_website_url=found["base_url"],
+            privacy_policy_url=policy_url,
+            privacy_contact_email=contact_email,
+            product_or_service_used=body.product_or_service_used,
+            user_full_name=body.user_full_name,
+            user_email=body.user_email,
+        )
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     try:
         parsed_result = parse_result_xml(raw_xml)
@@ -78,7 +100,7 @@ def generate_letter_route(body: GenerateLetterRequest):
                 # LLM might have found a different valid email, use it
                 final_email = email_address_parsed
 
-    return {
+    result = {
         "ok": True,
         "email_address": final_email,
         "company_name": company_name_out or body.company_name,
@@ -86,3 +108,107 @@ def generate_letter_route(body: GenerateLetterRequest):
         "letter": letter,
         "debug": {"privacy_policy_url": policy_url},
     }
+
+    key = user_key(request)
+    if key:
+        store.save_letter(key, urlparse(found["base_url"]).netloc.replace("www.", ""), result)
+
+    return result
+
+
+class StoredLetter(BaseModel):
+    id: int
+    domain: str | None
+    company_name: str | None
+    email_address: str | None
+    email_subject: str | None
+    letter: str | None
+    created_at: float
+
+
+class LetterHistoryPage(BaseModel):
+    letters: list[StoredLetter]
+    next_cursor: str | None
+
+
+@router.get("/history", response_model=LetterHistoryPage)
+def letter_history(request: Request, cursor: str | None = None, limit: int = 50):
+    """Generated letters for this user, newest first."""
+    key = user_key(request)
+    if not key:
+        raise HTTPException(401, "Not connected to Gmail")
+
+    limit = max(1, min(limit, 200))
+    before_id = None
+    if cursor:
+        try:
+            (before_id,) = decode_cursor(cursor)
+            before_id = int(before_id)
+        except (ValueError, TypeError):
+            raise HTTPException(400, "Invalid cursor")
+
+    etag = make_etag("letters", store.letters_version(key), cursor, limit, response_format(request))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    rows = store.list_letters(key, before_id=before_id, limit=limit)
+    response = encoded(request, {
+        "letters": rows,
+        "next_cursor": encode_cursor(rows[-1]["id"]) if len(rows) == limit else None,
+    })
+    set_cache_headers(response, etag)
+    return response
+
+
+class DispatchRequest(BaseModel):
+    # ids from /letter/history; only letters generated for this user are sent
+    letter_ids: list[int] = Field(..., min_length=1, max_length=MAX_DISPATCH)
+
+
+def _dispatch_session(request: Request) -> tuple[str, str, "Credentials"]:
+    if not letter_dispatch.DISPATCH_ENABLED:
+        raise HTTPException(404, "Letter dispatch is disabled")
+    session_id = request.cookies.get("gmail_session_id")
+    if not session_id:
+        raise HTTPException(401, "Missing session cookie")
+    # a session the token store knows, whatever the transport: the cookie alone proves nothing
+    creds = get_token_refresher().creds_for(session_id)
+    if not creds:
+        raise HTTPException(401, "Not connected to Gmail")
+    return user_key(request) or f"gmail:{session_id}", session_id, creds
+
+
+@router.post("/dispatch")
+def dispatch_letters(body: DispatchRequest, request: Request, background: BackgroundTasks):
+    """Queue stored letters for sending and start this user's dispatcher.
+
+    Letters already queued or sent are not sent again; failed ones are retried.
+    """
+    key, session_id, creds = _dispatch_session(request)
+    if letter_dispatch.DISPATCH_TRANSPORT == "gmail" and not creds.has_scopes([letter_dispatch.GMAIL_SEND_SCOPE]):
+        # granted before dispatch was enabled; sending would only fail with 403s
+        raise HTTPException(403, "Gmail was connected without send permission; reconnect Gmail")
+
+    stored = store.get_letters(key, body.letter_ids)
+    items = [
+        {**row, "idempotency_key": letter_dispatch.idempotency_key(row["id"])}
+        for row in stored
+        if row["email_address"] and row["email_subject"] and row["letter"]
+    ]
+
+    rows = store.enqueue_outbound(key, items) if items else []
+    letter_dispatch.recover_interrupted(key)
+    background.add_task(letter_dispatch.dispatch_queued, key, session_id)
+    return {
+        "ok": True,
+        "queued": sum(r["status"] == "queued" for r in rows),
+        "unknown_letter_ids": sorted(set(body.letter_ids) - {r["id"] for r in stored}),
+        "letters": rows,
+    }
+
+
+@router.get("/dispatch")
+def dispatch_status(request: Request):
+    key, _, _ = _dispatch_session(request)
+    return {**store.outbound_status(key), "running": letter_dispatch.is_running(key)}
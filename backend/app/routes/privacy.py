@@ -1,17 +1,38 @@
-import os, json, re
+import json, os, re
 from urllib.parse import urlparse
-from dotenv import load_dotenv
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
 
+from ..ai.llm import LLMUnavailable
+from ..state import get_delete_link_cache, get_llm_gateway
 
-load_dotenv(override=True)
-
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 router = APIRouter(prefix="/privacy", tags=["privacy"])
 
+DELETE_LINK_MODEL = "gpt-4.1-mini"
+
+# Crawl results at or above this confidence are returned without asking the LLM
+LLM_FALLBACK_THRESHOLD = float(os.getenv("DELETE_LINK_LLM_THRESHOLD", "0.6"))
+
+# Static instructions + output schema go in the system prompt (sent first, same
+# bytes every call) so prefix caching applies; only the domain varies per call.
+DELETE_LINK_SYSTEM_PROMPT = """Return STRICT JSON only. No markdown, no code fences, no commentary. Do not invent links.
+
+Output schema:
+{
+  "domain": string,
+  "best_url": string|null,
+  "purpose": "account_delete"|"privacy_rights"|"contact_support"|"unknown",
+  "confidence": number,
+  "steps": string[],
+  "evidence": [{"title": string, "url": string, "snippet": string}],
+  "notes": string
+}
+Rules:
+- Only output URLs that are on the domain (same domain or subdomain).
+- If you can’t find an on-domain delete link, choose the best on-domain support/contact page and set purpose="contact_support".
+"""
+
 
 class FindBody(BaseModel):
     domain: str
@@ -43,10 +64,35 @@ def extract_json(s: str) -> str:
     return s
 
 
-@router.post("/find_delete_link")
-def find_delete_link(body: FindBody):
-    domain = normalize_domain(body.domain)
+def lookup_delete_link(domain: str, llm_fallback: bool = True) -> dict | None:
+    """DeleteLinkResult for `domain` (already normalized).
+
+    Crawls the site first (cached per domain); the LLM + web search is only used when the crawl
+    isn't confident. If the LLM then fails, a partial crawl result is returned
+    instead of the error when there is one. With `llm_fallback=False` an
+    unconfident crawl returns None instead.
+    """
+    local = get_delete_link_cache().lookup(domain)
+    if local["confidence"] >= LLM_FALLBACK_THRESHOLD:
+        return local
+    if not llm_fallback:
+        return None
+
+    try:
+        return lookup_delete_link_llm(domain)
+    except (LLMUnavailable, ValueError) as e:
+        if not local["best_url"]:
+            raise
+        local["notes"] += f" LLM fallback unavailable ({e.__class__.__name__})."
+        return local
 
+
+def lookup_delete_link_llm(domain: str) -> dict:
+    """LLM + web_search lookup.
+
+    Raises LLMUnavailable when the model is saturated and ValueError when it
+    returns something that isn't the JSON schema.
+    """
     queries = [
         f"site:{domain} delete account",
         f"site:{domain} close account",
@@ -55,46 +101,19 @@ def find_delete_link(body: FindBody):
         f"site:{domain} account deletion",
     ]
 
-    schema = """Return STRICT JSON only (no markdown, no code fences, no extra text):
-{
-  "domain": string,
-  "best_url": string|null,
-  "purpose": "account_delete"|"privacy_rights"|"contact_support"|"unknown",
-  "confidence": number,
-  "steps": string[],
-  "evidence": [{"title": string, "url": string, "snippet": string}],
-  "notes": string
-}
-Rules:
-- Only output URLs that are on the domain (same domain or subdomain).
-- If you can’t find an on-domain delete link, choose the best on-domain support/contact page and set purpose="contact_support".
-"""
-
-    resp = client.responses.create(
-        model="gpt-4.1-mini",
+    text = get_llm_gateway().complete(
+        site="privacy.find_delete_link",
+        model=DELETE_LINK_MODEL,
+        system=DELETE_LINK_SYSTEM_PROMPT,
+        user=f"Domain: {domain}\nQueries: {json.dumps(queries)}",
         tools=[{"type": "web_search"}],
-        input=[
-            {
-                "role": "system",
-                "content": "Return STRICT JSON only. No markdown, no code fences, no commentary. Do not invent links."
-            },
-            {
-                "role": "user",
-                "content": f"{schema}\nDomain: {domain}\nQueries: {json.dumps(queries)}"
-            }
-        ],
         temperature=0.2,
-    )
-
-    text = resp.output_text.strip()
+    ).strip()
 
     try:
         data = json.loads(extract_json(text))
     except Exception:
-        raise HTTPException(
-            status_code=500,
-            detail=f"LLM did not return valid JSON. Got: {text[:400]}"
-        )
+        raise ValueError(f"LLM did not return valid JSON. Got: {text[:400]}")
 
     # Guardrail: ensure best_url is on-domain
     best = data.get("best_url")
@@ -105,3 +124,13 @@ Rules:
         data["confidence"] = 0.2
 
     return data
+
+
+@router.post("/find_delete_link")
+def find_delete_link(body: FindBody):
+    try:
+        return lookup_delete_link(normalize_domain(body.domain))
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
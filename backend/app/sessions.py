@@ -0,0 +1,55 @@
+"""
+Login session cookies and the validated identity behind a request.
+"""
+import os
+from datetime import timedelta
+
+from fastapi import HTTPException, Request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from . import store
+
+SESSION_SECRET = os.getenv("SESSION_SECRET", "dev-secret")
+SESSION_COOKIE = "session"
+SESSION_MAX_AGE_SECONDS = int(timedelta(days=7).total_seconds())
+
+serializer = URLSafeTimedSerializer(SESSION_SECRET)
+
+
+def read_session_cookie(cookie_value: str) -> dict:
+    try:
+        return serializer.loads(cookie_value, max_age=SESSION_MAX_AGE_SECONDS)
+    except SignatureExpired:
+        raise HTTPException(status_code=401, detail="Session expired")
+    except BadSignature:
+        raise HTTPException(status_code=401, detail="Invalid session")
+
+
+def login_key(request: Request) -> str | None:
+    """`user:<email>` from a valid signed login session."""
+    cookie = request.cookies.get(SESSION_COOKIE)
+    if not cookie:
+        return None
+    try:
+        email = read_session_cookie(cookie).get("email")
+    except HTTPException:
+        return None
+    return f"user:{email}" if email else None
+
+
+def user_key(request: Request) -> str | None:
+    """Who a request belongs to, from something the client can't mint at will.
+
+    The signed login session, else a Gmail session with stored tokens (under the
+    login it was connected from, if any). None when there is neither; the raw
+    gmail_session_id cookie alone is never enough.
+    """
+    from .routes.gmail import has_creds
+
+    key = login_key(request)
+    if key:
+        return key
+    gmail_session_id = request.cookies.get("gmail_session_id")
+    if gmail_session_id and has_creds(gmail_session_id):
+        return store.user_for_session(gmail_session_id) or f"gmail:{gmail_session_id}"
+    return None
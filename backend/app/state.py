@@ -0,0 +1,120 @@
+"""
+Process-wide singletons shared by the routers, built lazily on first use.
+"""
+import os
+import threading
+from typing import Any, Callable
+
+USER_AGENT = "Mozilla/5.0 (hackathon; privacy-finder)"
+
+_lock = threading.Lock()
+_singletons: dict[str, Any] = {}
+
+
+def _get_or_build(name: str, factory: Callable[[], Any]) -> Any:
+    obj = _singletons.get(name)
+    if obj is not None:
+        return obj
+    with _lock:
+        obj = _singletons.get(name)
+        if obj is None:
+            obj = factory()
+            _singletons[name] = obj
+    return obj
+
+
+def get_openai_client():
+    """One pooled OpenAI client for the whole process."""
+
+    def build():
+        from openai import OpenAI
+
+        return OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+
+    return _get_or_build("openai", build)
+
+
+def get_llm_gateway():
+    """The LLM gateway (pooled client, per-model limits, coalescing) from app.ai.llm."""
+
+    def build():
+        from .ai.llm import build_gateway
+
+        return build_gateway()
+
+    return _get_or_build("llm", build)
+
+
+def get_privacy_prefetcher():
+    """Background privacy-discovery warm-up + result cache (app.ai.prefetch)."""
+
+    def build():
+        from .ai.prefetch import PrivacyPrefetcher
+
+        return PrivacyPrefetcher()
+
+    return _get_or_build("privacy_prefetch", build)
+
+
+def get_delete_link_cache():
+    """Delete-link crawl results cached per domain (app.ai.delete_link_finder)."""
+
+    def build():
+        from .ai.delete_link_finder import CrawlCache
+
+        return CrawlCache()
+
+    return _get_or_build("delete_link_cache", build)
+
+
+def get_token_refresher():
+    """Gmail OAuth tokens refreshed ahead of expiry (app.token_refresh)."""
+
+    def build():
+        from .routes.gmail import delete_creds, load_creds, save_creds
+        from .token_refresh import TokenRefresher
+
+        return TokenRefresher(load_creds, save_creds, delete_creds)
+
+    return _get_or_build("token_refresh", build)
+
+
+def get_http_session():
+    """Shared requests.Session (keep-alive connection pool) for outbound crawling."""
+
+    def build():
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    return _get_or_build("http", build)
+
+
+def _gmail_build() -> Callable[..., Any]:
+    def build():
+        from googleapiclient.discovery import build as discovery_build
+
+        return discovery_build
+
+    return _get_or_build("gmail_build", build)
+
+
+def gmail_service(creds):
+    """Build a Gmail API client for one set of user credentials.
+
+    Service objects wrap a non-thread-safe httplib2 connection, so callers get
+    a fresh one per request / worker thread; only the import is shared.
+    """
+    return _gmail_build()("gmail", "v1", credentials=creds, cache_discovery=False)
+
+
+def reset() -> None:
+    """Drop all cached singletons (tests swap in fakes after calling this)."""
+    with _lock:
+        _singletons.clear()
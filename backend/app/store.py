@@ -0,0 +1,394 @@
+"""
+SQLite results store: scan results, letters, the outbound queue, batch checkpoints
+and which login each Gmail session belongs to.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DB_PATH = Path(os.getenv("RESULTS_DB_PATH", ".results.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_results (
+    user_key     TEXT NOT NULL,
+    domain       TEXT NOT NULL,
+    display_name TEXT,
+    confidence   TEXT,
+    evidence     TEXT,
+    last_seen    TEXT,
+    updated_at   REAL NOT NULL,
+    PRIMARY KEY (user_key, domain)
+);
+CREATE INDEX IF NOT EXISTS scan_results_by_update ON scan_results (user_key, updated_at, domain);
+
+CREATE TABLE IF NOT EXISTS letters (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_key      TEXT NOT NULL,
+    domain        TEXT,
+    company_name  TEXT,
+    email_address TEXT,
+    email_subject TEXT,
+    letter        TEXT,
+    created_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS letters_by_user ON letters (user_key, id);
+
+-- letters queued for sending; (user_key, idempotency_key) is never sent twice
+CREATE TABLE IF NOT EXISTS outbound_letters (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_key        TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    domain          TEXT,
+    email_address   TEXT NOT NULL,
+    email_subject   TEXT NOT NULL,
+    letter          TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    provider_id     TEXT,
+    error           TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    UNIQUE (user_key, idempotency_key)
+);
+CREATE INDEX IF NOT EXISTS outbound_by_status ON outbound_letters (user_key, status, id);
+
+CREATE TABLE IF NOT EXISTS batch_runs (
+    run_id     TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    accounts   INTEGER,
+    error      TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, session_id)
+);
+
+-- Gmail session -> the login it was connected from, so results survive a reconnect
+CREATE TABLE IF NOT EXISTS session_users (
+    session_id TEXT PRIMARY KEY,
+    user_key   TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+
+
+def connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    # a forked batch worker must not reuse its parent's connection
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def link_session(session_id: str, user_key: str) -> None:
+    conn = connect()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO session_users (session_id, user_key) VALUES (?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET user_key = excluded.user_key
+            """,
+            (session_id, user_key),
+        )
+
+
+def user_for_session(session_id: str) -> str | None:
+    row = connect().execute(
+        "SELECT user_key FROM session_users WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    return row["user_key"] if row else None
+
+
+def save_scan_results(user_key: str, results: list[dict]) -> None:
+    now = time.time()
+    conn = connect()
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO scan_results (user_key, domain, display_name, confidence, evidence, last_seen, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_key, domain) DO UPDATE SET
+                display_name = excluded.display_name,
+                confidence   = excluded.confidence,
+                evidence     = excluded.evidence,
+                last_seen    = excluded.last_seen,
+                updated_at   = excluded.updated_at
+            -- only bump updated_at (and so show up in deltas) when something changed
+            WHERE display_name IS NOT excluded.display_name
+               OR confidence IS NOT excluded.confidence
+               OR evidence IS NOT excluded.evidence
+               OR last_seen IS NOT excluded.last_seen
+            """,
+            [
+                (
+                    user_key,
+                    r["domain"],
+                    r.get("displayName"),
+                    r.get("confidence"),
+                    json.dumps(r.get("evidence") or []),
+                    r.get("lastSeen"),
+                    now,
+                )
+                for r in results
+            ],
+        )
+
+
+def _scan_row(r: sqlite3.Row) -> dict:
+    return {
+        "domain": r["domain"],
+        "displayName": r["display_name"],
+        "confidence": r["confidence"],
+        "evidence": json.loads(r["evidence"] or "[]"),
+        "lastSeen": r["last_seen"],
+        "updatedAt": r["updated_at"],
+    }
+
+
+def list_scan_results(
+    user_key: str,
+    since: float | None = None,
+    after: tuple[float, str] | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """Results changed after `since`, ordered by (updated_at, domain).
+
+    `after` is the (updated_at, domain) of the last row of the previous page.
+    """
+    sql = "SELECT * FROM scan_results WHERE user_key = ?"
+    params: list = [user_key]
+    if since is not None:
+        sql += " AND updated_at > ?"
+        params.append(since)
+    if after is not None:
+        sql += " AND (updated_at, domain) > (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY updated_at, domain LIMIT ?"
+    params.append(limit)
+    return [_scan_row(r) for r in connect().execute(sql, params)]
+
+
+def scan_results_version(user_key: str) -> tuple[int, float]:
+    """(row count, newest updated_at) - changes whenever the user's results do."""
+    row = connect().execute(
+        "SELECT COUNT(*), COALESCE(MAX(updated_at), 0) FROM scan_results WHERE user_key = ?",
+        (user_key,),
+    ).fetchone()
+    return row[0], row[1]
+
+
+def save_letter(user_key: str, domain: str | None, letter: dict) -> int:
+    conn = connect()
+    with conn:
+        cur = conn.execute(
+            """
+            INSERT INTO letters (user_key, domain, company_name, email_address, email_subject, letter, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_key,
+                domain,
+                letter.get("company_name"),
+                letter.get("email_address"),
+                letter.get("email_subject"),
+                letter.get("letter"),
+                time.time(),
+            ),
+        )
+    return cur.lastrowid
+
+
+def list_letters(user_key: str, before_id: int | None = None, limit: int = 50) -> list[dict]:
+    """Newest letters first; `before_id` is the id of the last row of the previous page."""
+    sql = "SELECT * FROM letters WHERE user_key = ?"
+    params: list = [user_key]
+    if before_id is not None:
+        sql += " AND id < ?"
+        params.append(before_id)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    rows = connect().execute(sql, params)
+    return [
+        {
+            "id": r["id"],
+            "domain": r["domain"],
+            "company_name": r["company_name"],
+            "email_address": r["email_address"],
+            "email_subject": r["email_subject"],
+            "letter": r["letter"],
+            "created_at": r["created_at"],
+        }
+        for r in rows
+    ]
+
+
+def letters_version(user_key: str) -> tuple[int, int]:
+    row = connect().execute(
+        "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM letters WHERE user_key = ?",
+        (user_key,),
+    ).fetchone()
+    return row[0], row[1]
+
+
+def get_letters(user_key: str, ids: list[int]) -> list[dict]:
+    if not ids:
+        return []
+    marks = ",".join("?" * len(ids))
+    rows = connect().execute(
+        f"SELECT * FROM letters WHERE user_key = ? AND id IN ({marks}) ORDER BY id",
+        [user_key, *ids],
+    )
+    return [dict(r) for r in rows]
+
+
+OUTBOUND_FIELDS = "id, idempotency_key, domain, email_address, email_subject, status, attempts, provider_id, error, updated_at"
+
+
+def enqueue_outbound(user_key: str, items: list[dict]) -> list[dict]:
+    """Queue letters for sending; returns the queue row of every item.
+
+    Items whose idempotency key is already known keep their row (and status),
+    except failed ones, which go back to the queue.
+    """
+    now = time.time()
+    conn = connect()
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO outbound_letters
+                (user_key, idempotency_key, domain, email_address, email_subject, letter, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+            ON CONFLICT (user_key, idempotency_key) DO UPDATE SET
+                status = 'queued', error = NULL, updated_at = excluded.updated_at
+            WHERE status = 'failed'
+            """,
+            [
+                (
+                    user_key,
+                    it["idempotency_key"],
+                    it.get("domain"),
+                    it["email_address"],
+                    it["email_subject"],
+                    it["letter"],
+                    now,
+                    now,
+                )
+                for it in items
+            ],
+        )
+    keys = [it["idempotency_key"] for it in items]
+    marks = ",".join("?" * len(keys))
+    rows = conn.execute(
+        f"SELECT {OUTBOUND_FIELDS} FROM outbound_letters WHERE user_key = ? AND idempotency_key IN ({marks}) ORDER BY id",
+        [user_key, *keys],
+    )
+    return [dict(r) for r in rows]
+
+
+def claim_outbound(user_key: str, limit: int) -> list[dict]:
+    """Atomically move up to `limit` queued letters to 'sending' and return them (oldest first)."""
+    conn = connect()
+    with conn:
+        rows = conn.execute(
+            """
+            UPDATE outbound_letters
+            SET status = 'sending', attempts = attempts + 1, updated_at = ?
+            WHERE id IN (
+                SELECT id FROM outbound_letters
+                WHERE user_key = ? AND status = 'queued'
+                ORDER BY id LIMIT ?
+            )
+            RETURNING *
+            """,
+            (time.time(), user_key, limit),
+        ).fetchall()
+    return sorted((dict(r) for r in rows), key=lambda r: r["id"])
+
+
+def finish_outbound(outbound_id: int, status: str, provider_id: str | None = None, error: str | None = None) -> None:
+    conn = connect()
+    with conn:
+        conn.execute(
+            "UPDATE outbound_letters SET status = ?, provider_id = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, provider_id, error, time.time(), outbound_id),
+        )
+
+
+def recover_outbound(user_key: str, stale_seconds: float = 600) -> int:
+    """Letters left 'sending' by a crashed run: maybe sent, so park them instead of resending."""
+    conn = connect()
+    with conn:
+        cur = conn.execute(
+            """
+            UPDATE outbound_letters
+            SET status = 'unknown', error = 'Interrupted while sending; check the Sent folder', updated_at = ?
+            WHERE user_key = ? AND status = 'sending' AND updated_at < ?
+            """,
+            (time.time(), user_key, time.time() - stale_seconds),
+        )
+    return cur.rowcount
+
+
+def outbound_status(user_key: str, limit: int = 100) -> dict:
+    conn = connect()
+    counts = {
+        r["status"]: r["n"]
+        for r in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM outbound_letters WHERE user_key = ? GROUP BY status",
+            (user_key,),
+        )
+    }
+    rows = conn.execute(
+        f"SELECT {OUTBOUND_FIELDS} FROM outbound_letters WHERE user_key = ? ORDER BY id DESC LIMIT ?",
+        (user_key, limit),
+    )
+    return {"counts": counts, "letters": [dict(r) for r in rows]}
+
+
+def checkpoint(run_id: str, session_id: str, status: str, accounts: int | None = None, error: str | None = None) -> None:
+    conn = connect()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO batch_runs (run_id, session_id, status, accounts, error, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id, session_id) DO UPDATE SET
+                status = excluded.status,
+                accounts = excluded.accounts,
+                error = excluded.error,
+                updated_at = excluded.updated_at
+            """,
+            (run_id, session_id, status, accounts, error, time.time()),
+        )
+
+
+def completed_sessions(run_id: str) -> set[str]:
+    rows = connect().execute(
+        "SELECT session_id FROM batch_runs WHERE run_id = ? AND status = 'done'",
+        (run_id,),
+    )
+    return {r["session_id"] for r in rows}
+
+
+def run_status(run_id: str) -> dict:
+    rows = connect().execute(
+        "SELECT session_id, status, accounts, error FROM batch_runs WHERE run_id = ? ORDER BY session_id",
+        (run_id,),
+    ).fetchall()
+    counts: dict[str, int] = {}
+    for r in rows:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {
+        "run_id": run_id,
+        "counts": counts,
+        "sessions": [dict(r) for r in rows],
+    }
@@ -0,0 +1,196 @@
+"""
+Refreshes Gmail OAuth tokens ahead of expiry, single-flight per session.
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import timezone
+from typing import TYPE_CHECKING, Callable
+
+from .singleflight import SingleFlight
+from .state import get_http_session
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+REFRESH_LEAD_SECONDS = int(os.getenv("TOKEN_REFRESH_LEAD_SECONDS", "300"))
+IDLE_SECONDS = int(os.getenv("TOKEN_REFRESH_IDLE_SECONDS", str(2 * 60 * 60)))
+RETRY_SECONDS = 30
+
+
+def _expiry_ts(creds: "Credentials") -> float | None:
+    # google-auth keeps expiry as a naive UTC datetime
+    if creds.expiry is None:
+        return None
+    return creds.expiry.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _grant_revoked(e: Exception) -> bool:
+    """invalid_grant from the token endpoint: the refresh token is revoked or expired for good."""
+    if getattr(e, "retryable", False):
+        return False
+    data = e.args[1] if len(e.args) > 1 else None
+    if isinstance(data, dict):
+        return data.get("error") == "invalid_grant"
+    return str(e.args[0] if e.args else "").startswith("invalid_grant")
+
+
+class TokenRefresher:
+    def __init__(
+        self,
+        load: Callable[[str], "Credentials | None"],
+        save: Callable[[str, "Credentials"], None],
+        delete: Callable[[str], None],
+        lead: float = REFRESH_LEAD_SECONDS,
+        idle: float = IDLE_SECONDS,
+    ):
+        self._load = load
+        self._save = save
+        self._delete = delete
+        self.lead = lead
+        self.idle = idle
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._creds: dict[str, "Credentials"] = {}
+        self._last_used: dict[str, float] = {}
+        self._due: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._flight = SingleFlight()
+        self._thread: threading.Thread | None = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def creds_for(self, session_id: str) -> "Credentials | None":
+        """Credentials for a request; None when the session is unknown or revoked."""
+        with self._lock:
+            creds = self._creds.get(session_id)
+        if creds is None:
+            creds = self._load(session_id)
+            if creds is None:
+                return None
+        self.track(session_id, creds)
+
+        if not creds.valid and creds.refresh_token:
+            # missed by the scheduler (new process, idle session): refresh now
+            try:
+                return self.refresh(session_id)
+            except Exception:
+                # upstream hiccup; the Gmail client will retry its own refresh
+                return creds
+        return creds
+
+    def track(self, session_id: str, creds: "Credentials") -> None:
+        """Start (or keep) refreshing `session_id` ahead of expiry."""
+        with self._lock:
+            self._creds[session_id] = creds
+            self._last_used[session_id] = time.monotonic()
+            expiry = _expiry_ts(creds)
+            if expiry is not None and session_id not in self._due and session_id not in self._flight:
+                self._push(session_id, expiry - self.lead)
+        self._ensure_thread()
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._creds.pop(session_id, None)
+            self._last_used.pop(session_id, None)
+            self._due.pop(session_id, None)  # heap entry goes stale
+
+    def refresh(self, session_id: str) -> "Credentials | None":
+        """Refresh now, or join the refresh already running for this session."""
+        creds, _ = self._flight.do(session_id, self._refresh_now, session_id)
+        return creds
+
+    def _refresh_now(self, session_id: str) -> "Credentials | None":
+        from google.auth.exceptions import RefreshError
+        from google.auth.transport.requests import Request
+
+        with self._lock:
+            self._due.pop(session_id, None)
+        # refresh a fresh copy and swap it in; requests holding the old object
+        # keep a token that is still valid for `lead` seconds
+        creds = self._load(session_id)
+        if creds is None or not creds.refresh_token:
+            self.forget(session_id)
+            return creds
+        try:
+            creds.refresh(Request(session=get_http_session()))
+        except RefreshError as e:
+            if not _grant_revoked(e):
+                # outage, throttling or misconfiguration: keep the token, retry later
+                with self._lock:
+                    self.failures += 1
+                raise
+            # the user has to reconnect, so drop the stored token too and
+            # /gmail/status reports disconnected
+            self.forget(session_id)
+            self._delete(session_id)
+            return None
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        self._save(session_id, creds)
+
+        with self._lock:
+            self.refreshes += 1
+            if session_id in self._last_used:
+                self._creds[session_id] = creds
+                expiry = _expiry_ts(creds)
+                if expiry is not None:
+                    self._push(session_id, expiry - self.lead)
+        return creds
+
+    def _push(self, session_id: str, due: float) -> None:
+        # caller holds self._lock
+        self._due[session_id] = due
+        heapq.heappush(self._heap, (due, session_id))
+        self._wake.notify()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="token-refresh", daemon=True)
+            self._thread.start()
+
+    def _next_due(self) -> str:
+        """Block until a tracked session is due for refresh and return it."""
+        with self._lock:
+            while True:
+                if not self._heap:
+                    self._wake.wait()
+                    continue
+                due, session_id = self._heap[0]
+                now = time.time()
+                if due > now:
+                    self._wake.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                if self._due.get(session_id) != due:
+                    continue  # stale entry: forgotten or rescheduled
+                if time.monotonic() - self._last_used.get(session_id, 0) > self.idle:
+                    for d in (self._creds, self._last_used, self._due):
+                        d.pop(session_id, None)
+                    continue
+                return session_id
+
+    def _loop(self) -> None:
+        while True:
+            session_id = self._next_due()
+            try:
+                self.refresh(session_id)
+            except Exception:
+                with self._lock:
+                    if session_id in self._last_used:
+                        self._push(session_id, time.time() + RETRY_SECONDS)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.time()
+            return {
+                "tracked": len(self._creds),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "next_refresh_in_seconds": round(min(self._due.values()) - now, 1) if self._due else None,
+            }
@@ -0,0 +1,97 @@
+"""
+Cold-start benchmark for the API process, built on `python -X importtime`.
+
+Measures two phases in a fresh interpreter:
+  startup        - `import app.main` (what every worker pays before serving)
+  first-request  - the lazily built clients in app.state (openai, requests
+                   session, Gmail discovery) that the first real request pays
+
+Usage (from backend/):
+    python scripts/bench_importtime.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MARKER = "--first-request--"
+
+PROGRAM = f"""
+import sys
+import app.main
+sys.stderr.write("{MARKER}\\n")
+from app import state
+state.get_openai_client()
+state.get_http_session()
+state._gmail_build()
+"""
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _parse(lines: list[str]) -> tuple[int, list[tuple[int, str]]]:
+    """Return (total microseconds, [(self_us, module)]) for one phase."""
+    total = 0
+    selfs = []
+    for line in lines:
+        m = LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, module = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        selfs.append((self_us, module))
+        # top-level imports have a single space of indentation
+        if len(indent) == 1:
+            total += cumulative_us
+    return total, selfs
+
+
+def run_once() -> tuple[tuple[int, list], tuple[int, list]]:
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_CLIENT_ID", "bench-client-id")
+    env.setdefault("OPENAI_API_KEY", "bench-key")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROGRAM],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+
+    lines = proc.stderr.splitlines()
+    split = lines.index(MARKER)
+    return _parse(lines[:split]), _parse(lines[split + 1:])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    startup_totals, first_totals = [], []
+    last = None
+    for _ in range(args.runs):
+        startup, first = run_once()
+        startup_totals.append(startup[0])
+        first_totals.append(first[0])
+        last = (startup, first)
+
+    for name, totals, phase in (
+        ("startup (import app.main)", startup_totals, last[0]),
+        ("first request (lazy clients)", first_totals, last[1]),
+    ):
+        print(f"{name}: median {statistics.median(totals) / 1000:.1f} ms "
+              f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f}, runs={args.runs})")
+        for self_us, module in sorted(phase[1], reverse=True)[:args.top]:
+            print(f"  {self_us / 1000:8.1f} ms  {module}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
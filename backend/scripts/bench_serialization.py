@@ -0,0 +1,101 @@
+"""
+Serialization / compression benchmark for the list endpoints' payloads.
+
+Encodes synthetic /gmail/accounts pages of N records (shaped like the stored
+scan results) with:
+  baseline  - FastAPI's default path: jsonable_encoder + stdlib JSONResponse
+  json      - app.responses.dumps_json (orjson when installed)
+  msgpack   - app.responses with `Accept: application/msgpack` (if installed)
+and reports CPU per encode plus body size raw, gzipped and brotli'd (if
+installed), i.e. what goes over the wire after CompressionMiddleware.
+
+Usage (from backend/):
+    python scripts/bench_serialization.py [--sizes 1000 10000] [--runs 20]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from app import responses  # noqa: E402
+
+EVIDENCE = ["welcome", "verify", "receipt", "newsletter"]
+
+
+def make_payload(n: int) -> dict:
+    rnd = random.Random(n)
+    accounts = []
+    for i in range(n):
+        name = f"{rnd.choice(['shop', 'mail', 'app', 'news', 'pay'])}{i}"
+        accounts.append({
+            "domain": f"{name}.com",
+            "displayName": name.capitalize(),
+            "confidence": rnd.choice(["high", "medium", "low"]),
+            "evidence": rnd.sample(EVIDENCE, rnd.randint(1, 3)),
+            "lastSeen": f"20{rnd.randint(18, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "updatedAt": 1_700_000_000 + rnd.random() * 10_000_000,
+        })
+    return {"accounts": accounts, "next_cursor": None, "watermark": accounts[-1]["updatedAt"]}
+
+
+def encoders() -> dict:
+    out = {
+        "baseline": lambda p: JSONResponse(jsonable_encoder(p)).body,
+        "json": responses.dumps_json,
+    }
+    if responses.msgpack is not None:
+        out["msgpack"] = lambda p: responses.msgpack.packb(p, use_bin_type=True)
+    return out
+
+
+def cpu_ms(fn, arg, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t = time.process_time()
+        fn(arg)
+        times.append((time.process_time() - t) * 1000)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"orjson: {responses.orjson is not None}  msgpack: {responses.msgpack is not None}  "
+          f"brotli: {responses.brotli is not None}\n")
+    codings = ["gzip"] + (["br"] if responses.brotli is not None else [])
+    header = f"{'records':>8} {'encoder':>9} {'encode ms':>10} {'raw KB':>9}"
+    for coding in codings:
+        header += f" {coding + ' KB':>9} {coding + ' ms':>8}"
+    print(header)
+
+    for n in args.sizes:
+        payload = make_payload(n)
+        base_bytes = None
+        for name, fn in encoders().items():
+            body = fn(payload)
+            if name == "baseline":
+                base_bytes = len(body)
+                # same bytes on the wire, just produced faster
+                assert json.loads(body) == json.loads(responses.dumps_json(payload))
+            line = f"{n:>8} {name:>9} {cpu_ms(fn, payload, args.runs):>10.2f} {len(body) / 1024:>9.1f}"
+            for coding in codings:
+                packed = responses.compress(coding, body)
+                ms = cpu_ms(lambda b: responses.compress(coding, b), body, max(3, args.runs // 4))
+                line += f" {len(packed) / 1024:>9.1f} {ms:>8.2f}"
+            print(line)
+        print(f"{'':>8} (baseline raw = {base_bytes / 1024:.1f} KB)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import threading
+
+import pytest
+
+from app import store
+
+
+@pytest.fixture
+def results_db(tmp_path, monkeypatch):
+    """A fresh results store for the test."""
+    monkeypatch.setattr(store, "DB_PATH", tmp_path / "results.sqlite3")
+    monkeypatch.setattr(store, "_local", threading.local())
+    return store
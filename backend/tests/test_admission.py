@@ -0,0 +1,55 @@
+import asyncio
+
+from app.admission import EndpointLimiter
+
+
+def test_released_slot_is_handed_to_the_oldest_waiter():
+    async def main():
+        limiter = EndpointLimiter("t", per_user=1, global_limit=1, queue_seconds=1)
+        assert await limiter.acquire("a")
+        b = asyncio.create_task(limiter.acquire("b"))
+        await asyncio.sleep(0)
+        c = asyncio.create_task(limiter.acquire("c"))
+        await asyncio.sleep(0)
+        assert limiter.snapshot()["queued"] == 2
+
+        limiter.release("a", 10.0)
+        assert await b
+        snap = limiter.snapshot()
+        # b got the slot straight from a; c is still queued behind it
+        assert snap["inflight"] == 1 and snap["queued"] == 1
+
+        limiter.release("b", 10.0)
+        assert await c
+
+    asyncio.run(main())
+
+
+def test_per_user_limit_does_not_block_other_users():
+    async def main():
+        limiter = EndpointLimiter("t", per_user=1, global_limit=4, queue_seconds=0.05)
+        assert await limiter.acquire("abuser")
+        assert not await limiter.acquire("abuser")  # queued, then shed
+        assert await limiter.acquire("other")
+        snap = limiter.snapshot()
+        assert snap["shed"] == 1 and snap["inflight"] == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    async def main():
+        limiter = EndpointLimiter("t", per_user=1, global_limit=1, queue_seconds=1)
+        assert await limiter.acquire("a")
+        b = asyncio.create_task(limiter.acquire("b"))
+        await asyncio.sleep(0)
+
+        limiter.release("a", 0.0)  # grants b's queued request ...
+        b.cancel()  # ... but its client is already gone
+        await asyncio.gather(b, return_exceptions=True)
+
+        snap = limiter.snapshot()
+        assert snap["inflight"] == 0 and snap["queued"] == 0
+        assert await limiter.acquire("c")
+
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+import pytest
+
+from app import state
+from app.ai import delete_link_finder, transport
+from app.ai.delete_link_finder import CrawlCache
+from app.routes import privacy
+
+
+def test_crawl_results_are_cached_per_domain(monkeypatch):
+    crawls = []
+
+    def crawl(domain):
+        crawls.append(domain)
+        return {"domain": domain, "best_url": f"https://{domain}/account/delete", "notes": ""}
+
+    monkeypatch.setattr(delete_link_finder, "find_delete_link_by_crawl", crawl)
+    cache = CrawlCache(ttl=60, miss_ttl=0)
+
+    first = cache.lookup("example.com")
+    first["notes"] += " annotated by a caller"
+    assert cache.lookup("example.com")["notes"] == ""
+    assert crawls == ["example.com"]
+
+
+def test_misses_expire_quickly(monkeypatch):
+    crawls = []
+
+    def crawl(domain):
+        crawls.append(domain)
+        return {"domain": domain, "best_url": None, "notes": ""}
+
+    monkeypatch.setattr(delete_link_finder, "find_delete_link_by_crawl", crawl)
+    cache = CrawlCache(ttl=60, miss_ttl=0)
+
+    cache.lookup("down.example")
+    cache.lookup("down.example")
+    assert crawls == ["down.example", "down.example"]
+
+
+def fake_site(monkeypatch, pages: dict[str, str], root: str = "https://example.com"):
+    """Serve canned HTML by URL; anything else is a failed fetch."""
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return pages.get(url)
+
+    monkeypatch.setattr(transport, "fetch_root", lambda base: (root, pages.get(root)))
+    monkeypatch.setattr(delete_link_finder, "_fetch", fetch)
+    return fetched
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    calls = []
+
+    def llm(domain):
+        calls.append(domain)
+        return {"domain": domain, "best_url": f"https://{domain}/from-llm", "confidence": 0.8}
+
+    state.reset()
+    monkeypatch.setattr(privacy, "lookup_delete_link_llm", llm)
+    yield calls
+    state.reset()
+
+
+def test_score_prefers_account_deletion_over_help():
+    assert delete_link_finder._score("https://example.com/account/delete", "Delete account") == (100, "account_delete")
+    assert delete_link_finder._score("https://example.com/privacy-center", "Your data") == (45, "privacy_rights")
+    assert delete_link_finder._score("https://example.com/help", "Help") == (15, "contact_support")
+    assert delete_link_finder._score("https://example.com/blog", "News") == (0, "unknown")
+
+
+def test_linked_delete_page_is_confident_without_the_llm(monkeypatch, no_llm):
+    fake_site(monkeypatch, {
+        "https://example.com": '<a href="/help">Help</a> <a href="/account/delete">Delete your account</a>',
+        "https://example.com/account/delete": "<h1>Delete your account</h1>",
+    })
+
+    found = privacy.lookup_delete_link("example.com")
+
+    assert found["best_url"] == "https://example.com/account/delete"
+    assert found["purpose"] == "account_delete"
+    assert found["confidence"] == 0.9
+    assert no_llm == []
+
+
+def test_help_only_site_falls_back_to_the_llm(monkeypatch, no_llm):
+    fake_site(monkeypatch, {
+        "https://example.com": '<a href="/help">Help centre</a>',
+        "https://example.com/help": "<p>How can we help?</p>",
+    })
+
+    crawled = delete_link_finder.find_delete_link_by_crawl("example.com")
+    assert crawled["purpose"] == "contact_support"
+    assert crawled["confidence"] < privacy.LLM_FALLBACK_THRESHOLD
+
+    assert privacy.lookup_delete_link("example.com")["best_url"] == "https://example.com/from-llm"
+    assert no_llm == ["example.com"]
+
+
+def test_off_domain_anchors_are_ignored(monkeypatch):
+    fetched = fake_site(monkeypatch, {
+        "https://example.com": (
+            '<a href="https://evil.example/account/delete">Delete account</a>'
+            '<a href="https://notexample.com/delete-account">Delete account</a>'
+            '<a href="https://help.example.com/close-account">Close account</a>'
+        ),
+    })
+
+    found = delete_link_finder.find_delete_link_by_crawl("example.com")
+
+    assert found["best_url"] == "https://help.example.com/close-account"
+    assert [e["url"] for e in found["evidence"]] == ["https://help.example.com/close-account"]
+    assert not any("evil.example" in u or "notexample.com" in u for u in fetched)
@@ -0,0 +1,83 @@
+import re
+import threading
+import time
+
+from app import gmail_fetch
+from app.gmail_fetch import DAY, list_message_ids_sharded
+
+
+class FakeGmail:
+    """messages.list over an in-memory mailbox, honouring after:/before: and paging."""
+
+    def __init__(self, mailbox: dict[str, int]):
+        self.mailbox = mailbox  # id -> received (epoch seconds)
+        self.queries: list[str] = []
+        self._lock = threading.Lock()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, maxResults, fields, q="", pageToken=None):
+        with self._lock:
+            self.queries.append(q)
+        lo = int(re.search(r"after:(\d+)", q).group(1))
+        hi = int(re.search(r"before:(\d+)", q).group(1))
+        ids = sorted((i for i, ts in self.mailbox.items() if lo < ts < hi), key=lambda i: -self.mailbox[i])
+        offset = int(pageToken or 0)
+        page = ids[offset:offset + maxResults]
+        token = str(offset + maxResults) if offset + maxResults < len(ids) else None
+        return _Call({"messages": [{"id": i} for i in page], "nextPageToken": token})
+
+
+class _Call:
+    def __init__(self, body):
+        self.body = body
+
+    def execute(self, num_retries=0):
+        return self.body
+
+
+def newest(mailbox: dict[str, int], n: int) -> list[str]:
+    return sorted(mailbox, key=lambda i: -mailbox[i])[:n]
+
+
+def test_sparse_mailbox_is_merged_newest_first():
+    now = int(time.time())
+    mailbox = {f"m{d}": now - d * DAY - 60 for d in range(0, 360, 7)}
+    gmail = FakeGmail(mailbox)
+
+    ids = list_message_ids_sharded(lambda: gmail, "from:x", years=1, limit=100, shard_seconds=30 * DAY)
+
+    assert ids == newest(mailbox, 100)
+
+
+def test_dense_shards_are_split_and_deduplicated(monkeypatch):
+    # small pages, so a shard with more than `limit` messages has to be split
+    monkeypatch.setattr(gmail_fetch, "PAGE_SIZE", 20)
+    now = int(time.time())
+    # a burst of mail in the newest shard, a trickle elsewhere
+    mailbox = {f"burst{i}": now - 3 * DAY - i * 600 for i in range(300)}
+    mailbox.update({f"old{d}": now - d * DAY for d in range(40, 300, 20)})
+    gmail = FakeGmail(mailbox)
+
+    ids = list_message_ids_sharded(lambda: gmail, "from:x", years=1, limit=50, shard_seconds=60 * DAY)
+
+    assert len(ids) == len(set(ids)) == 50
+    assert ids == newest(mailbox, 50)
+    # the burst's full first page made it split into narrower shards
+    widths = {int(re.search(r"before:(\d+)", q).group(1)) - int(re.search(r"after:(\d+)", q).group(1))
+              for q in gmail.queries}
+    assert min(widths) < 60 * DAY // 4
+
+
+def test_limit_larger_than_mailbox_returns_everything_once():
+    now = int(time.time())
+    mailbox = {f"m{i}": now - i * 3 * DAY for i in range(1, 80)}
+    gmail = FakeGmail(mailbox)
+
+    ids = list_message_ids_sharded(lambda: gmail, "from:x", years=1, limit=500, shard_seconds=45 * DAY)
+
+    assert ids == newest(mailbox, 500)
@@ -0,0 +1,192 @@
+import smtplib
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app import letter_dispatch
+from app.letter_dispatch import FakeMailTransport, GmailTransport, SendOutcomeUnknown, SMTPTransport, TransientSendError
+
+
+def enqueue(store, user: str, ids: list[int]) -> list[dict]:
+    rows = store.get_letters(user, ids)
+    return store.enqueue_outbound(user, [{**r, "idempotency_key": letter_dispatch.idempotency_key(r["id"])} for r in rows])
+
+
+def queue_letters(store, user: str, n: int) -> list[int]:
+    ids = [
+        store.save_letter(user, f"site{i}.com", {
+            "email_address": f"privacy@site{i}.com",
+            "company_name": f"Site {i}",
+            "email_subject": "Delete my data",
+            "letter": "Please delete my account.",
+        })
+        for i in range(n)
+    ]
+    enqueue(store, user, ids)
+    return ids
+
+
+@pytest.fixture
+def fake_transport(monkeypatch):
+    monkeypatch.setattr(letter_dispatch, "DISPATCH_TRANSPORT", "fake")
+    monkeypatch.setattr(FakeMailTransport, "sent", [])
+    return FakeMailTransport
+
+
+def test_queued_letters_are_sent_once(results_db, fake_transport):
+    ids = queue_letters(results_db, "u", 3)
+
+    assert letter_dispatch.dispatch_queued("u", "s", batch_size=2) == {"started": True, "sent": 3, "failed": 0, "unknown": 0}
+    # enqueueing the same letters again doesn't send them again
+    assert {r["status"] for r in enqueue(results_db, "u", ids)} == {"sent"}
+    assert letter_dispatch.dispatch_queued("u", "s")["sent"] == 0
+
+    sent = fake_transport.sent
+    assert [m["To"] for m in sent] == [f"privacy@site{i}.com" for i in range(3)]
+    assert len({m["Message-ID"] for m in sent}) == 3
+
+
+def test_message_id_is_stable_per_letter():
+    row = {"user_key": "u", "idempotency_key": "letter:1"}
+    assert letter_dispatch.message_id(row) == letter_dispatch.message_id(dict(row))
+    assert letter_dispatch.message_id(row) != letter_dispatch.message_id({**row, "user_key": "v"})
+
+
+def test_transient_failures_are_retried_then_marked_failed(results_db, fake_transport, monkeypatch):
+    queue_letters(results_db, "u", 1)
+    attempts = []
+
+    def flaky(self, msg):
+        attempts.append(msg["Message-ID"])
+        raise TransientSendError("421 try again later")
+
+    monkeypatch.setattr(FakeMailTransport, "send", flaky)
+
+    assert letter_dispatch.dispatch_queued("u", "s") == {"started": True, "sent": 0, "failed": 1, "unknown": 0}
+    assert len(attempts) == letter_dispatch.MAX_ATTEMPTS
+    assert len(set(attempts)) == 1  # same Message-ID on every attempt
+    assert results_db.outbound_status("u")["counts"] == {"failed": 1}
+
+
+def test_unclear_outcomes_are_parked_not_resent(results_db, fake_transport, monkeypatch):
+    queue_letters(results_db, "u", 1)
+    attempts = []
+
+    def timed_out(self, msg):
+        attempts.append(msg)
+        raise SendOutcomeUnknown("timed out waiting for the reply")
+
+    monkeypatch.setattr(FakeMailTransport, "send", timed_out)
+
+    assert letter_dispatch.dispatch_queued("u", "s") == {"started": True, "sent": 0, "failed": 0, "unknown": 1}
+    assert len(attempts) == 1
+    status = results_db.outbound_status("u")
+    assert status["counts"] == {"unknown": 1}
+    assert "check the Sent folder" in status["letters"][0]["error"]
+
+    # asking again doesn't resend it either
+    assert {r["status"] for r in enqueue(results_db, "u", [1])} == {"unknown"}
+    assert letter_dispatch.dispatch_queued("u", "s")["unknown"] == 0
+    assert len(attempts) == 1
+
+
+class FakeSMTP:
+    instances: list["FakeSMTP"] = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_with: Exception | None = None
+        self.alive = True
+        FakeSMTP.instances.append(self)
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected()
+        return 250, b"OK"
+
+    def send_message(self, msg):
+        if self.fail_with:
+            raise self.fail_with
+        self.sent.append(msg)
+
+    def quit(self):
+        pass
+
+
+def test_smtp_transport_maps_errors(monkeypatch):
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    transport = SMTPTransport()
+    msg = letter_dispatch.build_messages(
+        [{"id": 1, "user_key": "u", "idempotency_key": "letter:1", "email_address": "a@b.c",
+          "email_subject": "s", "letter": "body"}],
+        transport.sender,
+    )[0]
+
+    assert transport.send(msg) == msg["Message-ID"]
+
+    FakeSMTP.instances[-1].fail_with = smtplib.SMTPResponseException(451, b"greylisted")
+    with pytest.raises(TransientSendError):
+        transport.send(msg)
+
+    FakeSMTP.instances[-1].fail_with = smtplib.SMTPResponseException(550, b"no such user")
+    with pytest.raises(smtplib.SMTPResponseException):
+        transport.send(msg)
+
+    # dropped mid-send: maybe delivered
+    FakeSMTP.instances[-1].fail_with = smtplib.SMTPServerDisconnected()
+    with pytest.raises(SendOutcomeUnknown):
+        transport.send(msg)
+    transport.send(msg)  # reconnects
+    assert len(FakeSMTP.instances) == 2
+
+    # a connection that went stale while idle is replaced before sending
+    FakeSMTP.instances[-1].alive = False
+    transport.send(msg)
+    assert len(FakeSMTP.instances) == 3
+
+
+def test_smtp_connect_failure_is_transient(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise ConnectionRefusedError("connection refused")
+
+    monkeypatch.setattr(smtplib, "SMTP", refuse)
+    with pytest.raises(TransientSendError):
+        SMTPTransport().send(letter_dispatch.EmailMessage())
+
+
+class FakeGmailSend:
+    def __init__(self, error: Exception):
+        self.error = error
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return self
+
+    def execute(self):
+        raise self.error
+
+
+def http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+@pytest.mark.parametrize("error, expected", [
+    (http_error(429), TransientSendError),
+    (ConnectionRefusedError("refused"), TransientSendError),
+    (http_error(500), SendOutcomeUnknown),
+    (http_error(503), SendOutcomeUnknown),
+    (TimeoutError("read timed out"), SendOutcomeUnknown),
+    (ConnectionResetError("reset by peer"), SendOutcomeUnknown),
+    (http_error(400), HttpError),
+])
+def test_gmail_transport_requeues_only_when_nothing_was_sent(error, expected):
+    transport = GmailTransport.__new__(GmailTransport)
+    transport._service = FakeGmailSend(error)
+    with pytest.raises(expected):
+        transport.send(letter_dispatch.EmailMessage())
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.ai.llm import FakeLLMBackend, LLMGateway, LLMUnavailable
+
+
+def test_identical_prompts_are_coalesced():
+    backend = FakeLLMBackend(responder=lambda req: f"echo {req.user}", latency=0.1)
+    gateway = LLMGateway(backend=backend)
+
+    with ThreadPoolExecutor(5) as pool:
+        texts = list(pool.map(lambda _: gateway.complete("site", "m", "sys", "same"), range(5)))
+
+    assert texts == ["echo same"] * 5
+    assert len(backend.requests) == 1
+    usage = gateway.usage()["site"]
+    assert usage["calls"] == 1
+    assert usage["coalesced"] == 4
+
+
+def test_different_prompts_each_reach_the_backend():
+    backend = FakeLLMBackend(responder=lambda req: req.user)
+    gateway = LLMGateway(backend=backend)
+
+    assert gateway.complete("site", "m", "sys", "a") == "a"
+    assert gateway.complete("site", "m", "sys", "b") == "b"
+    assert [r.user for r in backend.requests] == ["a", "b"]
+
+
+def test_saturated_model_gives_up_with_llm_unavailable():
+    release = threading.Event()
+    backend = FakeLLMBackend(responder=lambda req: release.wait(5) and "done")
+    gateway = LLMGateway(backend=backend, model_concurrency={"m": 1}, queue_timeout=0.05)
+
+    with ThreadPoolExecutor(1) as pool:
+        busy = pool.submit(gateway.complete, "site", "m", "sys", "first")
+        while not backend.requests:
+            pass
+        with pytest.raises(LLMUnavailable):
+            gateway.complete("site", "m", "sys", "second")
+        release.set()
+        assert busy.result() == "done"
+
+    assert gateway.usage()["site"]["errors"] == 1
@@ -0,0 +1,22 @@
+from app.ai import privacy_finder, transport
+
+
+def test_redirected_homepage_keeps_the_requested_base(monkeypatch):
+    fetched = []
+    monkeypatch.setattr(
+        transport, "fetch_root",
+        lambda base: ("https://brand.example", '<a href="/privacy">Privacy</a>'),
+    )
+
+    def fetch(url):
+        fetched.append(url)
+        return "Write to privacy@brand.example" if url.endswith("/privacy") else None
+
+    monkeypatch.setattr(transport, "fetch", fetch)
+
+    found = privacy_finder.find_privacy_policy_and_email("https://www.shop.example")
+
+    assert found["base_url"] == "https://www.shop.example"
+    # the crawl itself follows the redirect
+    assert found["privacy_policy_url"] == "https://brand.example/privacy"
+    assert all(u.startswith("https://brand.example/") for u in fetched)
@@ -0,0 +1,34 @@
+from starlette.requests import Request
+
+from app import sessions
+from app.routes import gmail
+
+
+def request_with(**cookies) -> Request:
+    header = "; ".join(f"{k}={v}" for k, v in cookies.items())
+    return Request({"type": "http", "headers": [(b"cookie", header.encode())] if header else []})
+
+
+def test_user_key_needs_a_validated_identity(results_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(gmail, "TOK_DIR", tmp_path)
+
+    assert sessions.user_key(request_with()) is None
+    # a made-up Gmail session is nobody
+    assert sessions.user_key(request_with(gmail_session_id="made-up")) is None
+    assert sessions.user_key(request_with(session="forged")) is None
+
+    (tmp_path / "s1.json").write_text("{}")
+    assert sessions.user_key(request_with(gmail_session_id="s1")) == "gmail:s1"
+
+    login = sessions.serializer.dumps({"email": "a@example.com"})
+    assert sessions.user_key(request_with(session=login, gmail_session_id="made-up")) == "user:a@example.com"
+
+
+def test_reconnected_mailbox_keeps_its_owner(results_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(gmail, "TOK_DIR", tmp_path)
+    for sid in ("old", "new"):
+        (tmp_path / f"{sid}.json").write_text("{}")
+        results_db.link_session(sid, "user:a@example.com")
+
+    assert sessions.user_key(request_with(gmail_session_id="old")) == "user:a@example.com"
+    assert sessions.user_key(request_with(gmail_session_id="new")) == "user:a@example.com"
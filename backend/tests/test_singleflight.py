@@ -0,0 +1,51 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    with ThreadPoolExecutor(8) as pool:
+        outcomes = list(pool.map(lambda _: flight.do("k", slow), range(8)))
+
+    assert len(calls) == 1
+    assert [r for r, _ in outcomes] == ["result"] * 8
+    assert sum(shared for _, shared in outcomes) == 7
+    assert "k" not in flight
+
+
+def test_errors_reach_every_caller_and_free_the_key():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def boom():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "k", boom)
+        started.wait()
+        follower = pool.submit(flight.do, "k", boom)
+        for fut in (leader, follower):
+            with pytest.raises(ValueError):
+                fut.result()
+
+    assert flight.do("k", lambda: 42) == (42, False)
+
+
+def test_distinct_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from google.auth.exceptions import RefreshError
+
+from app.token_refresh import TokenRefresher
+
+
+class FakeCreds:
+    refresh_token = "refresh"
+
+    def __init__(self, counter: list, error: Exception | None = None):
+        self.counter = counter
+        self.error = error
+        self.expiry = datetime.utcnow() - timedelta(minutes=1)
+
+    @property
+    def valid(self):
+        return self.expiry > datetime.utcnow()
+
+    def refresh(self, request):
+        self.counter.append(1)
+        time.sleep(0.1)
+        if self.error:
+            raise self.error
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+def make_refresher(error: Exception | None = None):
+    refreshes, saved, deleted = [], [], []
+    lock = threading.Lock()
+
+    def load(session_id):
+        with lock:
+            return None if session_id in deleted else FakeCreds(refreshes, error)
+
+    refresher = TokenRefresher(load, lambda s, c: saved.append(s), deleted.append)
+    return refresher, refreshes, saved, deleted
+
+
+def test_concurrent_requests_share_one_refresh():
+    refresher, refreshes, saved, _ = make_refresher()
+
+    with ThreadPoolExecutor(5) as pool:
+        creds = list(pool.map(lambda _: refresher.creds_for("s"), range(5)))
+
+    assert len(refreshes) == 1
+    assert saved == ["s"]
+    assert all(c.valid for c in creds)
+
+
+def test_revoked_grant_deletes_the_stored_token():
+    error = RefreshError("invalid_grant: Token has been expired or revoked.", {"error": "invalid_grant"})
+    refresher, _, saved, deleted = make_refresher(error)
+
+    assert refresher.creds_for("s") is None
+    assert deleted == ["s"] and saved == []
+    assert refresher.creds_for("s") is None
+
+
+@pytest.mark.parametrize("error", [
+    RefreshError("temporarily_unavailable: try later", {"error": "temporarily_unavailable"}, retryable=True),
+    RefreshError("internal_failure", {"error": "internal_failure"}, retryable=True),
+    RefreshError("invalid_client: The OAuth client was not found.", {"error": "invalid_client"}),
+])
+def test_other_refresh_errors_keep_the_stored_token(error):
+    refresher, _, _, deleted = make_refresher(error)
+
+    with pytest.raises(RefreshError):
+        refresher.refresh("s")
+    assert deleted == []
+    assert refresher.snapshot()["failures"] == 1
@@ -0,0 +1,99 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from app.ai import transport
+
+
+class FakeSession:
+    """Answers get() per URL: a callable gets the URL, anything else is the status code."""
+
+    def __init__(self, routes: dict):
+        self.routes = routes
+        self.calls: list[str] = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None, allow_redirects=True):
+        with self._lock:
+            self.calls.append(url)
+        answer = self.routes[url]
+        if callable(answer):
+            answer = answer(url)
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(status_code=answer, url=url, text=url)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = FakeSession({})
+    monkeypatch.setattr(transport, "get_http_session", lambda: fake)
+    monkeypatch.setattr(transport, "_breakers", {})
+    return fake
+
+
+def test_breaker_opens_after_repeated_timeouts(session):
+    session.routes["https://slow.example/"] = requests.Timeout()
+
+    for _ in range(transport.BREAKER_FAILURES + 2):
+        assert transport.fetch("https://slow.example/") is None
+
+    # once open, the host isn't contacted at all
+    assert len(session.calls) == transport.BREAKER_FAILURES
+    assert transport.breaker_states() == {"slow.example": {"state": "open", "failures": transport.BREAKER_FAILURES}}
+
+
+def test_one_probe_after_cooldown(session):
+    session.routes["https://flaky.example/"] = requests.ConnectionError()
+    for _ in range(transport.BREAKER_FAILURES):
+        transport.fetch("https://flaky.example/")
+    breaker = transport.breaker_for("flaky.example")
+
+    breaker.opened_at -= breaker.cooldown
+    assert [breaker.allow() for _ in range(3)] == [True, False, False]
+
+    # a failed probe re-opens it straight away
+    breaker.record_failure()
+    assert breaker.state == transport.OPEN and not breaker.allow()
+
+    # a good probe closes it
+    breaker.opened_at -= breaker.cooldown
+    session.routes["https://flaky.example/"] = 200
+    calls = len(session.calls)
+    assert transport.fetch("https://flaky.example/") == "https://flaky.example/"
+    assert len(session.calls) == calls + 1
+    assert breaker.state == transport.CLOSED and breaker.failures == 0
+
+
+def test_hedged_root_fetch_takes_the_first_good_answer(session):
+    release = threading.Event()
+
+    def stuck(url):
+        release.wait(5)
+        return 200
+
+    session.routes.update({
+        "https://example.com": 503,
+        "https://www.example.com": stuck,
+        "http://example.com": 200,
+    })
+    try:
+        base, html = transport.fetch_root("https://example.com", hedge_delay=0.01)
+    finally:
+        release.set()
+
+    assert (base, html) == ("http://example.com", "http://example.com")
+    assert session.calls[0] == "https://example.com"
+
+
+def test_hedged_root_fetch_gives_up_when_every_variant_fails(session):
+    session.routes.update({
+        "https://example.com": requests.Timeout(),
+        "https://www.example.com": 404,
+        "http://example.com": 500,
+    })
+
+    assert transport.fetch_root("https://example.com", hedge_delay=0.01) == ("https://example.com", None)
+    assert sorted(session.calls) == sorted(transport.root_variants("https://example.com"))
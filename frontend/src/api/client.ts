@@ -1,3 +1,5 @@
+import { decodeMsgpack } from "./msgpack";
+
 export type ScanResult = {
   domain: string;
   displayName?: string;
@@ -63,9 +65,63 @@ export type DeleteLinkResult = {
   notes: string;
 };
 
+export type StoredAccount = ScanResult & {
+  updatedAt: number;
+};
+
+export type AccountsPage = {
+  accounts: StoredAccount[];
+  next_cursor: string | null;
+  watermark: number | null;
+};
+
+export type StoredLetter = LetterData & {
+  id: number;
+  domain: string | null;
+  created_at: number;
+};
+
+export type LetterHistoryPage = {
+  letters: StoredLetter[];
+  next_cursor: string | null;
+};
+
+export type EnrichedAccount = {
+  domain: string;
+  privacy_policy_url: string | null;
+  privacy_contact_email: string | null;
+  privacy_contact_email_estimated: boolean;
+  letter_ready: boolean;
+  delete_link: DeleteLinkResult | null;
+  errors: Record<string, string>;
+};
+
+export type DispatchStatus = "queued" | "sending" | "sent" | "failed" | "unknown";
+
+export type OutboundLetter = {
+  id: number;
+  idempotency_key: string;
+  domain: string | null;
+  email_address: string;
+  email_subject: string;
+  status: DispatchStatus;
+  attempts: number;
+  provider_id: string | null;
+  error: string | null;
+  updated_at: number;
+};
+
+export type DispatchQueue = {
+  counts: Partial<Record<DispatchStatus, number>>;
+  letters: OutboundLetter[];
+  running: boolean;
+};
+
 
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
 const MOCK_MODE = import.meta.env.VITE_MOCK === "true";
+// List endpoints answer in MessagePack when the backend has it installed, JSON otherwise
+const COMPACT = { headers: { Accept: "application/msgpack, application/json;q=0.9" } };
 
 async function http<T>(path: string, options?: RequestInit): Promise<T> {
   const response = await fetch(`${API_BASE}${path}`, {
@@ -82,6 +138,9 @@ async function http<T>(path: string, options?: RequestInit): Promise<T> {
     throw new Error(error.detail || `HTTP ${response.status}`);
   }
 
+  if (response.headers.get("Content-Type")?.startsWith("application/msgpack")) {
+    return decodeMsgpack(await response.arrayBuffer()) as T;
+  }
   return response.json();
 }
 
@@ -193,10 +252,64 @@ export async function scanAccounts(): Promise<ScanResult[]> {
     return [...mockResults];
   }
 
-  const data = await http<ScanResult[]>("/gmail/scan");
+  const data = await http<ScanResult[]>("/gmail/scan", COMPACT);
   return data;
 }
 
+// Stored scan results. Pass the previous `watermark` as `since` to fetch only
+// accounts that changed; the backend answers unchanged pages with 304 (ETag),
+// which the browser cache turns back into the cached body.
+export async function getAccounts(since?: number | null): Promise<{ accounts: StoredAccount[]; watermark: number | null }> {
+  if (MOCK_MODE) {
+    return { accounts: [], watermark: null };
+  }
+
+  const accounts: StoredAccount[] = [];
+  let watermark: number | null = since ?? null;
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams();
+    if (since != null) params.set("since", String(since));
+    if (cursor) params.set("cursor", cursor);
+    const page: AccountsPage = await http<AccountsPage>(`/gmail/accounts?${params}`, COMPACT);
+    accounts.push(...page.accounts);
+    watermark = page.watermark ?? watermark;
+    cursor = page.next_cursor;
+  } while (cursor);
+
+  return { accounts, watermark };
+}
+
+export async function getLetterHistory(): Promise<StoredLetter[]> {
+  if (MOCK_MODE) {
+    return [];
+  }
+
+  const letters: StoredLetter[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams();
+    if (cursor) params.set("cursor", cursor);
+    const page: LetterHistoryPage = await http<LetterHistoryPage>(`/letter/history?${params}`, COMPACT);
+    letters.push(...page.letters);
+    cursor = page.next_cursor;
+  } while (cursor);
+
+  return letters;
+}
+
+// Queues stored letters (by history id) for sending; the same letter is never sent twice.
+export async function dispatchLetters(letterIds: number[]): Promise<{ queued: number; letters: OutboundLetter[] }> {
+  return http("/letter/dispatch", {
+    method: "POST",
+    body: JSON.stringify({ letter_ids: letterIds }),
+  });
+}
+
+export async function getDispatchQueue(): Promise<DispatchQueue> {
+  return http<DispatchQueue>("/letter/dispatch");
+}
+
 export async function findDeleteLink(domain: string): Promise<DeleteLinkResult> {
     return http<DeleteLinkResult>("/privacy/find_delete_link", {
       method: "POST",
@@ -204,6 +317,53 @@ export async function findDeleteLink(domain: string): Promise<DeleteLinkResult>
     });
   }
 
+// Mirrors MAX_ENRICH_DOMAINS in backend/app/routes/accounts.py
+const MAX_ENRICH_DOMAINS = 200;
+
+// Streams one enriched record per domain (NDJSON) as soon as the backend has it.
+export async function enrichAccounts(
+  domains: string[],
+  onResult: (result: EnrichedAccount) => void,
+): Promise<void> {
+  if (MOCK_MODE) {
+    return;
+  }
+
+  for (let i = 0; i < domains.length; i += MAX_ENRICH_DOMAINS) {
+    await enrichChunk(domains.slice(i, i + MAX_ENRICH_DOMAINS), onResult);
+  }
+}
+
+async function enrichChunk(
+  domains: string[],
+  onResult: (result: EnrichedAccount) => void,
+): Promise<void> {
+  const response = await fetch(`${API_BASE}/accounts/enrich`, {
+    method: "POST",
+    credentials: "include",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ domains }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = lines.pop() ?? "";
+    for (const line of lines) {
+      if (line.trim()) onResult(JSON.parse(line) as EnrichedAccount);
+    }
+    if (done) break;
+  }
+  if (buffered.trim()) onResult(JSON.parse(buffered) as EnrichedAccount);
+}
+
 export async function logout(): Promise<void> {
   if (MOCK_MODE) {
     return;
@@ -231,7 +391,7 @@ export async function disconnectGmail(): Promise<void> {
 export async function getGmailMessages(): Promise<EmailMessage[]> {
 
   // Call /gmail/scan which returns the company data
-  const data = await http<EmailMessage[]>("/gmail/scan");
+  const data = await http<EmailMessage[]>("/gmail/scan", COMPACT);
   return data;
 }
 
@@ -0,0 +1,67 @@
+// Minimal MessagePack decoder for API responses: nil, bool, ints, floats,
+// strings, binary, arrays and maps (no extension types).
+export function decodeMsgpack(buffer: ArrayBuffer): unknown {
+  const bytes = new Uint8Array(buffer);
+  const view = new DataView(buffer);
+  const text = new TextDecoder();
+  let pos = 0;
+
+  const take = (n: number): number => {
+    const at = pos;
+    pos += n;
+    return at;
+  };
+  const str = (len: number): string => text.decode(bytes.subarray(take(len), pos));
+  const bin = (len: number): Uint8Array => bytes.slice(take(len), pos);
+  const arr = (len: number): unknown[] => {
+    const out = new Array<unknown>(len);
+    for (let i = 0; i < len; i++) out[i] = read();
+    return out;
+  };
+  const map = (len: number): Record<string, unknown> => {
+    const out: Record<string, unknown> = {};
+    for (let i = 0; i < len; i++) {
+      const key = String(read());
+      out[key] = read();
+    }
+    return out;
+  };
+
+  function read(): unknown {
+    const type = bytes[take(1)];
+    if (type <= 0x7f) return type;
+    if (type <= 0x8f) return map(type & 0x0f);
+    if (type <= 0x9f) return arr(type & 0x0f);
+    if (type <= 0xbf) return str(type & 0x1f);
+    if (type >= 0xe0) return type - 0x100;
+
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(view.getUint8(take(1)));
+      case 0xc5: return bin(view.getUint16(take(2)));
+      case 0xc6: return bin(view.getUint32(take(4)));
+      case 0xca: return view.getFloat32(take(4));
+      case 0xcb: return view.getFloat64(take(8));
+      case 0xcc: return view.getUint8(take(1));
+      case 0xcd: return view.getUint16(take(2));
+      case 0xce: return view.getUint32(take(4));
+      case 0xcf: return Number(view.getBigUint64(take(8)));
+      case 0xd0: return view.getInt8(take(1));
+      case 0xd1: return view.getInt16(take(2));
+      case 0xd2: return view.getInt32(take(4));
+      case 0xd3: return Number(view.getBigInt64(take(8)));
+      case 0xd9: return str(view.getUint8(take(1)));
+      case 0xda: return str(view.getUint16(take(2)));
+      case 0xdb: return str(view.getUint32(take(4)));
+      case 0xdc: return arr(view.getUint16(take(2)));
+      case 0xdd: return arr(view.getUint32(take(4)));
+      case 0xde: return map(view.getUint16(take(2)));
+      case 0xdf: return map(view.getUint32(take(4)));
+    }
+    throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+  }
+
+  return read();
+}
@@ -20,7 +20,7 @@ import Footer from '../components/Footer';
 import Button from '../components/Button';
 import LetterModal from '../components/LetterModal';
 import './Dashboard.css';
-import { getGmailMessages } from '../api/client';
+import { getGmailMessages, getAccounts, getLetterHistory, enrichAccounts } from '../api/client';
 
 type ViewState = "landing" | "scanning" | "results" | "error";
 
@@ -56,15 +56,75 @@ export default function Dashboard() {
   const [activeSearchDomain, setActiveSearchDomain] = useState<string | null>(null);
 
 
+  const [accountsWatermark, setAccountsWatermark] = useState<number | null>(null);
+  const [enrichedDomains, setEnrichedDomains] = useState<Record<string, boolean>>({});
+
+
   useEffect(() => {
     const fetchEmails = async () => {
       if (!gmailConnected) return;
-      const data = await getGmailMessages();
-      setEmails(data);
+      // Stored results first (cheap indexed read); only scan Gmail if we have none yet
+      const stored = await getAccounts().catch(() => null);
+      if (stored && stored.accounts.length > 0) {
+        setEmails(stored.accounts);
+        setAccountsWatermark(stored.watermark);
+      } else {
+        const data = await getGmailMessages();
+        setEmails(data);
+      }
+
+      const history = await getLetterHistory().catch(() => []);
+      if (history.length > 0) {
+        const byDomain: Record<string, LetterData> = {};
+        // history is newest first; keep the newest letter per domain
+        for (const l of [...history].reverse()) {
+          if (!l.domain) continue;
+          byDomain[l.domain] = {
+            letter: l.letter,
+            email_address: l.email_address,
+            company_name: l.company_name,
+            email_subject: l.email_subject,
+          };
+        }
+        setLettersByDomain((prev) => ({ ...byDomain, ...prev }));
+      }
     };
     fetchEmails();
   }, [gmailConnected]);
 
+  // Fill crawled delete links for every listed domain; unconfident ones are
+  // looked up (with the LLM) only when the user clicks the row
+  useEffect(() => {
+    const domains = emails.map((e) => e.domain).filter((d) => d && !enrichedDomains[d]);
+    if (domains.length === 0) return;
+    setEnrichedDomains((prev) => ({ ...prev, ...Object.fromEntries(domains.map((d) => [d, true])) }));
+    enrichAccounts(domains, (result) => {
+      const link = result.delete_link;
+      if (link) {
+        setOptOutByDomain((prev) => (prev[result.domain] ? prev : { ...prev, [result.domain]: link }));
+      }
+    }).catch(() => {
+      // Best effort; the per-row buttons still work on demand
+    });
+  }, [emails, enrichedDomains]);
+
+  // When the tab regains focus, fetch only accounts that changed since the last read
+  useEffect(() => {
+    if (!gmailConnected || accountsWatermark == null) return;
+    const onFocus = async () => {
+      const delta = await getAccounts(accountsWatermark).catch(() => null);
+      if (!delta || delta.accounts.length === 0) return;
+      setEmails((prev) => {
+        const byDomain = new Map(prev.map((e) => [e.domain, e]));
+        for (const a of delta.accounts) byDomain.set(a.domain, a);
+        return [...byDomain.values()];
+      });
+      setAccountsWatermark(delta.watermark);
+    };
+    window.addEventListener("focus", onFocus);
+    return () => window.removeEventListener("focus", onFocus);
+  }, [gmailConnected, accountsWatermark]);
+
   const scanSteps = [
     "Connecting to Gmail...",
     "Scanning inbox for signup emails...",